@@ -0,0 +1,87 @@
+"""
+Shared, lazily created SDK clients.
+
+The OpenAI and Ollama SDKs take hundreds of milliseconds to import, so nothing here
+imports them until a client is first asked for: `--help`, exports and other offline
+paths never pay for them. Each factory returns one cached client per process (and per
+set of options), so every caller shares its HTTP connection pool, sized by
+CLIENT_MAX_CONNECTIONS / CLIENT_MAX_KEEPALIVE in config.py.
+
+`warm_up(factory, ...)` builds clients on a background thread while the script is busy
+with something else (waiting for input, spawning an MCP server, hashing files), so the
+first request does not pay for the import either.
+"""
+
+import importlib
+import threading
+import config
+
+class LazyModule:
+    """Stands in for a module and imports it on first attribute access.
+
+    Meant for names needed only on rare paths, such as SDK exception classes in
+    `except` clauses (evaluated only when an exception reaches them).
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        return f"<lazy module {self._name!r}{'' if self._module is None else ' (loaded)'}>"
+
+openai = LazyModule("openai")
+
+_clients = {}
+_lock = threading.Lock()
+
+def _cached(key, create):
+    with _lock:
+        if key not in _clients:
+            _clients[key] = create()
+        return _clients[key]
+
+def _limits():
+    import httpx
+    return httpx.Limits(max_connections=config.CLIENT_MAX_CONNECTIONS,
+                        max_keepalive_connections=config.CLIENT_MAX_KEEPALIVE)
+
+def openai_client(**options):
+    """The shared `openai.OpenAI` client (OPENAI_API_KEY, OPENAI_BASE_URL from the environment).
+
+    `options` are passed to the constructor (e.g. max_retries=0); each distinct set
+    gets its own cached client. Use `client.with_options(...)` for per-call variations
+    that should share the pool.
+    """
+    def create():
+        from openai import DefaultHttpxClient, OpenAI
+        return OpenAI(api_key=config.OPENAI_API_KEY, http_client=DefaultHttpxClient(limits=_limits()), **options)
+    return _cached(("openai", tuple(sorted(options.items()))), create)
+
+def ollama_async_client(host=None):
+    """The shared `ollama.AsyncClient` for `host` (default OLLAMA_HOST)."""
+    host = host or config.OLLAMA_HOST
+
+    def create():
+        from ollama import AsyncClient
+        return AsyncClient(host=host, limits=_limits())
+    return _cached(("ollama-async", host), create)
+
+def warm_up(*factories):
+    """Calls each client factory on a daemon thread, overlapping the SDK import with other work.
+
+    Errors are swallowed: the same call made later on the main thread raises them
+    where they can be reported.
+    """
+    def run():
+        for factory in factories:
+            try:
+                factory()
+            except Exception:
+                pass
+    threading.Thread(target=run, name="clients.warm_up", daemon=True).start()
@@ -0,0 +1,30 @@
+"""
+Configuration shared by the sub-projects.
+
+Importing this module loads `.env` from the repo root once, without overriding
+variables already set in the environment, so scripts and the fake backends in
+offline-bench/ can always win with real environment variables. Settings used by more
+than one script are read here; knobs specific to one script stay next to its code.
+"""
+
+import os
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+LOG_DIR = os.path.join(REPO_ROOT, "logs")
+ENV_FILE = os.path.join(REPO_ROOT, ".env")
+
+def load_env(path=ENV_FILE):
+    """Loads a dotenv file into os.environ (existing variables are kept). Returns whether it existed."""
+    if not os.path.exists(path):
+        return False
+    from dotenv import load_dotenv
+    return load_dotenv(dotenv_path=path)
+
+load_env()
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_VECTOR_STORE_ID = os.getenv("OPENAI_VECTOR_STORE_ID")
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+# Connection pool of each shared SDK client (see clients.py)
+CLIENT_MAX_CONNECTIONS = int(os.getenv("CLIENT_MAX_CONNECTIONS", "100"))
+CLIENT_MAX_KEEPALIVE = int(os.getenv("CLIENT_MAX_KEEPALIVE", "20"))
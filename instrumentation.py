@@ -0,0 +1,209 @@
+"""
+Latency tracing and profiling shared by the sub-projects.
+
+Code marks the operations worth timing with `span("name", **attrs)` (a context manager)
+or `@traced("name")`. Spans nest per thread/task. When tracing is on, every finished
+span is appended to a JSONL trace file and a p50/p95 summary per span name is printed to
+stderr when the session ends. When it is off, `span()` returns a shared no-op object, so
+instrumented code pays one attribute check per span.
+
+Entry points call `add_arguments(parser)` and run under `with session(args, "name"):`,
+which adds `--trace [FILE]` and `--profile [FILE]` (cProfile). `TRACE=1` or
+`TRACE=<file>` in the environment enables tracing too.
+"""
+
+import contextvars
+import cProfile
+import functools
+import inspect
+import io
+import itertools
+import json
+import math
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from config import LOG_DIR
+
+_current = contextvars.ContextVar("current_span", default=None)
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+NOOP = _NoopSpan()
+
+class Span:
+    __slots__ = ("tracer", "name", "attrs", "id", "parent", "start", "_t0", "_token")
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        """Adds attributes known only once the operation is under way (sizes, status...)."""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        parent = _current.get()
+        self.parent = parent.id if parent is not None else None
+        self.id = next(self.tracer.ids)
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        ms = (time.perf_counter() - self._t0) * 1000
+        try:
+            _current.reset(self._token)
+        except ValueError:
+            # Exited in another context (e.g. an async generator closed elsewhere)
+            _current.set(None)
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.tracer.record(self, ms)
+        return False
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.session_name = None
+        self.ids = itertools.count(1)
+        self.durations = {}
+        self._file = None
+        self._lock = threading.Lock()
+
+    def enable(self, path, session_name):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.session_name = session_name
+        self._file = open(path, "a", encoding="utf-8")
+        self.enabled = True
+
+    def span(self, name, **attrs):
+        if not self.enabled:
+            return NOOP
+        return Span(self, name, attrs)
+
+    def record(self, span, ms):
+        line = json.dumps({
+            "session": self.session_name, "id": span.id, "parent": span.parent, "name": span.name,
+            "start": round(span.start, 6), "ms": round(ms, 3), "thread": threading.current_thread().name,
+            **({"attrs": span.attrs} if span.attrs else {}),
+        }, default=str)
+        with self._lock:
+            self.durations.setdefault(span.name, []).append(ms)
+            if self._file is not None:
+                self._file.write(line + "\n")
+
+    def summary(self):
+        """Rows of (name, count, p50, p95, max, total) in ms, slowest total first."""
+        with self._lock:
+            rows = []
+            for name, values in self.durations.items():
+                ordered = sorted(values)
+                rows.append((name, len(ordered), percentile(ordered, 50), percentile(ordered, 95),
+                             ordered[-1], sum(ordered)))
+        return sorted(rows, key=lambda row: -row[5])
+
+    def print_summary(self, out=None):
+        out = out or sys.stderr
+        rows = self.summary()
+        if not rows:
+            return
+        print(f"\n{'span':<28} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'total ms':>10}", file=out)
+        for name, count, p50, p95, worst, total in rows:
+            print(f"{name:<28} {count:>6} {p50:>9.1f} {p95:>9.1f} {worst:>9.1f} {total:>10.1f}", file=out)
+        print(f"trace: {self.path}", file=out)
+
+    def close(self):
+        with self._lock:
+            self.enabled = False
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list: the smallest value with at least pct% of
+    the values at or below it (sorted here; an already sorted list costs one pass)."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct * len(ordered) / 100) - 1)]
+
+tracer = Tracer()
+
+def span(name, **attrs):
+    return tracer.span(name, **attrs)
+
+def traced(name=None):
+    """Decorator form of `span` for sync and async functions."""
+    def decorator(fn):
+        label = name or fn.__qualname__
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                if not tracer.enabled:
+                    return await fn(*args, **kwargs)
+                with tracer.span(label):
+                    return await fn(*args, **kwargs)
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not tracer.enabled:
+                    return fn(*args, **kwargs)
+                with tracer.span(label):
+                    return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def add_arguments(parser):
+    parser.add_argument("--trace", nargs="?", const="", default=None, metavar="FILE",
+                        help="Record timing spans to a JSONL trace (default logs/trace_<name>_<time>_<pid>.jsonl) "
+                             "and print a p50/p95 summary at exit")
+    parser.add_argument("--profile", nargs="?", const="", default=None, metavar="FILE",
+                        help="Run under cProfile, print the top functions and optionally save the stats to FILE")
+
+def _default_trace_path(name):
+    # The pid keeps concurrent processes (e.g. several spawned servers) in separate files
+    return os.path.join(LOG_DIR, f"trace_{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}.jsonl")
+
+@contextmanager
+def session(args, name):
+    """Runs an entry point with the tracing/profiling its flags (or `TRACE`) ask for."""
+    trace = getattr(args, "trace", None)
+    if trace is None and os.getenv("TRACE") not in (None, "", "0"):
+        trace = "" if os.getenv("TRACE") == "1" else os.getenv("TRACE")
+    if trace is not None:
+        tracer.enable(trace or _default_trace_path(name), name)
+    profile = getattr(args, "profile", None)
+    profiler = cProfile.Profile() if profile is not None else None
+    if profiler:
+        profiler.enable()
+    try:
+        yield tracer
+    finally:
+        if profiler:
+            profiler.disable()
+            report = io.StringIO()
+            pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(25)
+            print(report.getvalue(), file=sys.stderr)
+            if profile:
+                profiler.dump_stats(profile)
+                print(f"profile: {profile} (open with `python -m pstats` or snakeviz)", file=sys.stderr)
+        if tracer.enabled:
+            tracer.print_summary()
+            tracer.close()
@@ -1,119 +1,375 @@
+import argparse
 import asyncio
-import os, sys
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
-from ollama import Client
-from dotenv import load_dotenv
+import json
+import os, sys, time
+from contextlib import AsyncExitStack
 # Add parent directory to path
-sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config  # loads .env before the settings below are read
+from clients import LazyModule, ollama_async_client, warm_up
 from helpers import Colors
+import instrumentation
+from instrumentation import span, traced
+from history import ConversationHistory, tool_result_text
 
-# Load environment variables from .env file
-BASE = os.path.dirname(os.path.dirname(__file__)) if "__file__" in globals() else os.getcwd()
-load_dotenv(dotenv_path=os.path.join(BASE, '.env'), verbose=True)
+# The MCP SDK is imported when the first session opens, not for --help
+mcp = LazyModule("mcp")
 
 # Configuration
-OLLAMA_URL = os.getenv("OLLAMA_HOST", "http://localhost:11434")
 MODEL = "llama3.2"
-client = Client(host=OLLAMA_URL)
+TOOL_CONCURRENCY = int(os.getenv("TOOL_CONCURRENCY", "8"))
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "30"))
+# Log follows may outlast TOOL_TIMEOUT: the server caps them at FOLLOW_MAX_SECONDS,
+# and the client waits that long plus FOLLOW_MARGIN before giving up on the call
+FOLLOW_MAX_SECONDS = float(os.getenv("FOLLOW_MAX_SECONDS", "60"))
+FOLLOW_MARGIN = 10.0
+# URL of a shared, long-lived server (e.g. http://host:8000/mcp or .../sse); unset spawns one over stdio
+MCP_SERVER_URL = os.getenv("MCP_SERVER_URL")
 
-async def run():
-    # 1. Setup the server connection parameters
-    server_params = StdioServerParameters(
+async def stream_chat(history, tools=None, echo=True):
+    """Streams one model call over the budgeted history, printing tokens as they arrive.
+
+    Returns the assembled assistant message and the timing/token stats of the call.
+    """
+    messages, history_stats = history.build()
+    start_time = time.perf_counter()
+    first_token_time = None
+    content, tool_calls, chunks = [], [], 0
+    final = None
+
+    with span("model.chat", model=MODEL, messages=len(messages)) as chat_span:
+        stream = await ollama_async_client().chat(model=MODEL, messages=messages, tools=tools, stream=True)
+        async for chunk in stream:
+            message = chunk['message']
+            if message.get('content'):
+                if first_token_time is None:
+                    first_token_time = time.perf_counter()
+                    if echo:
+                        print(f"\n{Colors.GREEN}Llama:{Colors.ENDC} ", end="", flush=True)
+                if echo:
+                    print(message['content'], end="", flush=True)
+                content.append(message['content'])
+                chunks += 1
+            if message.get('tool_calls'):
+                if first_token_time is None:
+                    first_token_time = time.perf_counter()
+                tool_calls.extend(message['tool_calls'])
+            if chunk.get('done'):
+                final = chunk
+        chat_span.set(ttft_ms=round(((first_token_time or time.perf_counter()) - start_time) * 1000, 1),
+                      tool_calls=len(tool_calls))
+
+    end_time = time.perf_counter()
+    if content and echo:
+        print("\n")
+
+    # Prefer Ollama's own generation counters, fall back to what we saw on the wire
+    eval_count = (final and final.get('eval_count')) or chunks
+    eval_seconds = (final.get('eval_duration') or 0) / 1e9 if final else 0
+    if not eval_seconds and first_token_time is not None:
+        eval_seconds = end_time - first_token_time
+    stats = {
+        'ttft': (first_token_time or end_time) - start_time,
+        'total': end_time - start_time,
+        'eval_count': eval_count,
+        'prompt_eval_count': (final and final.get('prompt_eval_count')) or 0,
+        'tokens_per_sec': eval_count / eval_seconds if eval_seconds else 0.0,
+        **history_stats,
+    }
+
+    assistant_message = {'role': 'assistant', 'content': "".join(content)}
+    if tool_calls:
+        assistant_message['tool_calls'] = tool_calls
+    return assistant_message, stats
+
+def print_stats(stats):
+    print(f"{Colors.CYAN}⏱  TTFT {stats['ttft']:.2f}s | {stats['tokens_per_sec']:.1f} tok/s | "
+          f"{stats['eval_count']} tokens | prompt {stats['prompt_eval_count']} tokens | "
+          f"saved ~{stats['saved_tokens']} history tokens | total {stats['total']:.2f}s{Colors.ENDC}")
+
+def call_timeout(fn_args):
+    """Seconds to wait for one tool call: TOOL_TIMEOUT, or longer for a log follow."""
+    try:
+        follow = min(float(fn_args.get("follow_seconds") or 0), FOLLOW_MAX_SECONDS)
+    except (AttributeError, TypeError, ValueError):
+        follow = 0
+    return max(TOOL_TIMEOUT, follow + FOLLOW_MARGIN) if follow > 0 else TOOL_TIMEOUT
+
+async def execute_tool_calls(session, tool_calls, echo=True):
+    """Runs the model's tool calls concurrently and returns their outputs in call order.
+
+    A failing or timed out call yields an error string (followed by any log lines it
+    already streamed); it never cancels the others.
+    """
+    semaphore = asyncio.Semaphore(TOOL_CONCURRENCY)
+
+    async def execute(tool_call):
+        fn_name = tool_call['function']['name']
+        fn_args = tool_call['function']['arguments']
+        streamed = []
+
+        async def on_progress(progress, total, message):
+            # Followed log lines arrive here while the call runs
+            if message is not None:
+                streamed.append(message)
+                if echo:
+                    print(f"  {Colors.CYAN}┆ {message}{Colors.ENDC}")
+
+        async with semaphore:
+            if echo:
+                print(f"  Executing {Colors.BOLD}{fn_name}{Colors.ENDC} with {fn_args}...")
+            timeout = call_timeout(fn_args)
+            try:
+                with span("tool.call", tool=fn_name):
+                    result = await asyncio.wait_for(
+                        session.call_tool(fn_name, arguments=fn_args, progress_callback=on_progress), timeout
+                    )
+                # The model needs the streamed lines too, not just the count in the result
+                return "\n".join([tool_result_text(result), *streamed])
+            except asyncio.TimeoutError:
+                tool_output = f"Error executing tool: {fn_name} timed out after {timeout:g}s"
+            except Exception as e:
+                tool_output = f"Error executing tool: {str(e)}"
+            if echo:
+                print(f"{Colors.RED}{tool_output}{Colors.ENDC}")
+            # Lines already shown to the user were received; the model should see them too
+            return "\n".join([tool_output, *streamed])
+
+    return await asyncio.gather(*(execute(tool_call) for tool_call in tool_calls))
+
+@traced("turn")
+async def run_turn(session, history, ollama_tools, echo=True):
+    """Runs one user turn (model -> tools -> model) and appends it to `history`.
+
+    Returns the final assistant message and the per-turn stats.
+    """
+    # Call Ollama (streamed)
+    if echo:
+        print(f"{Colors.YELLOW}Thinking...{Colors.ENDC}", end="\r")
+    message, stats = await stream_chat(history, tools=ollama_tools, echo=echo)
+    turn = {'ttft': stats['ttft'], 'model_seconds': stats['total'], 'tool_seconds': 0.0,
+            'tool_calls': [], 'eval_count': stats['eval_count']}
+
+    # Check for tool calls
+    if message.get('tool_calls'):
+        tool_calls = message['tool_calls']
+
+        # Add the model's intent to call a tool to history
+        history.append(message)
+
+        if echo:
+            print(f"{Colors.BLUE}➔ Model wants to use tools:{Colors.ENDC}")
+            print_stats(stats)
+
+        # Execute tool calls via MCP, concurrently
+        tool_start = time.perf_counter()
+        tool_outputs = await execute_tool_calls(session, tool_calls, echo=echo)
+        turn['tool_seconds'] = time.perf_counter() - tool_start
+        turn['tool_calls'] = [tool_call['function']['name'] for tool_call in tool_calls]
+
+        # Add results to history, in the order the model asked for them
+        for tool_output in tool_outputs:
+            history.append({
+                'role': 'tool',
+                'content': tool_output,
+            })
+
+        # Second call to Ollama with the tool data
+        message, stats = await stream_chat(history, echo=echo)
+        turn['model_seconds'] += stats['total']
+        turn['eval_count'] += stats['eval_count']
+
+    # The answer was already printed while streaming
+    history.append(message)
+    if echo:
+        print_stats(stats)
+    return message, turn
+
+def server_params():
+    return mcp.StdioServerParameters(
         command="python",
         args=["local-tools/server.py"],
         env=os.environ.copy(),
     )
 
+@traced("mcp.connect")
+async def open_session(stack, server_url=None):
+    """Connects to an MCP server inside `stack` and returns its initialized session.
+
+    With `server_url` it joins a shared network server (streamable HTTP, or SSE if the
+    URL ends in /sse); otherwise it spawns a private server over stdio.
+    """
+    if server_url and server_url.rstrip("/").endswith("/sse"):
+        from mcp.client.sse import sse_client
+        read, write = await stack.enter_async_context(sse_client(server_url))
+    elif server_url:
+        from mcp.client.streamable_http import streamablehttp_client
+        read, write, _ = await stack.enter_async_context(streamablehttp_client(server_url))
+    else:
+        from mcp.client.stdio import stdio_client
+        read, write = await stack.enter_async_context(stdio_client(server_params()))
+    session = await stack.enter_async_context(mcp.ClientSession(read, write))
+    await session.initialize()
+    return session
+
+async def read_server_stats(session):
+    """Returns the server's own session counters, or None if it doesn't expose them."""
+    try:
+        result = await session.read_resource("stats://server")
+        return json.loads(result.contents[0].text)
+    except Exception:
+        return None
+
+async def get_ollama_tools(session):
+    """Converts the MCP tool schemas to Ollama's function-calling format."""
+    tools_list = await session.list_tools()
+    ollama_tools = []
+    for tool in tools_list.tools:
+        ollama_tools.append({
+            "type": "function",
+            "function": {
+                "name": tool.name,
+                "description": tool.description,
+                "parameters": tool.inputSchema
+            }
+        })
+    return ollama_tools
+
+async def run(server_url=None):
     print(f"{Colors.HEADER}--- Starting MCP Client with {MODEL} ---{Colors.ENDC}")
 
-    # 2. Connect to the MCP Server
-    async with stdio_client(server_params) as (read, write):
-        async with ClientSession(read, write) as session:
-            await session.initialize()
-
-            # Prepare tools for Ollama
-            tools_list = await session.list_tools()
-            ollama_tools = []
-            for tool in tools_list.tools:
-                ollama_tools.append({
-                    "type": "function",
-                    "function": {
-                        "name": tool.name,
-                        "description": tool.description,
-                        "parameters": tool.inputSchema
-                    }
-                })
-
-            conversation_history = []
-
-            print(f"{Colors.GREEN}System ready. Type 'quit' to exit.{Colors.ENDC}\n")
-
-            # 3. Start the Chat Loop
-            while True:
-                user_input = input(f"{Colors.BOLD}You: {Colors.ENDC}")
-                if user_input.lower() in ['quit', 'exit', 'q']:
-                    break
-
-                # Add user message to history
-                conversation_history.append({'role': 'user', 'content': user_input})
-
-                # Call Ollama
-                print(f"{Colors.YELLOW}Thinking...{Colors.ENDC}", end="\r")
-                response = client.chat(
-                    model=MODEL,
-                    messages=conversation_history,
-                    tools=ollama_tools,
-                )
-
-                # Check for tool calls
-                if response.get('message', {}).get('tool_calls'):
-                    tool_calls = response['message']['tool_calls']
-
-                    # Add the model's intent to call a tool to history
-                    conversation_history.append(response['message'])
-
-                    print(f"{Colors.BLUE}➔ Model wants to use tools:{Colors.ENDC}")
-
-                    for tool_call in tool_calls:
-                        fn_name = tool_call['function']['name']
-                        fn_args = tool_call['function']['arguments']
-
-                        print(f"  Executing {Colors.BOLD}{fn_name}{Colors.ENDC} with {fn_args}...")
-
-                        # Execute tool via MCP
-                        try:
-                            result = await session.call_tool(fn_name, arguments=fn_args)
-                            tool_output = str(result.content)
-                        except Exception as e:
-                            tool_output = f"Error executing tool: {str(e)}"
-                            print(f"{Colors.RED}{tool_output}{Colors.ENDC}")
-
-                        # Add result to history
-                        conversation_history.append({
-                            'role': 'tool',
-                            'content': tool_output,
-                        })
-
-                    # Second call to Ollama with the tool data
-                    final_response = client.chat(
-                        model=MODEL,
-                        messages=conversation_history,
-                    )
+    # Import the Ollama SDK while the MCP server starts
+    warm_up(ollama_async_client)
+
+    # Connect to the MCP Server
+    async with AsyncExitStack() as stack:
+        session = await open_session(stack, server_url)
+        ollama_tools = await get_ollama_tools(session)
+        server_stats = await read_server_stats(session) if server_url else None
+        if server_stats:
+            print(f"{Colors.BLUE}Connected to shared server at {server_url} ({server_stats['transport']}, "
+                  f"{server_stats['active_sessions']} active sessions, "
+                  f"{server_stats['total_sessions']} since start){Colors.ENDC}")
+        conversation_history = ConversationHistory()
+
+        print(f"{Colors.GREEN}System ready. Type 'quit' to exit.{Colors.ENDC}\n")
 
-                    answer = final_response['message']['content']
-                    conversation_history.append(final_response['message'])
+        # Start the Chat Loop
+        while True:
+            # Read input off the event loop so the MCP session keeps being served
+            user_input = await asyncio.to_thread(input, f"{Colors.BOLD}You: {Colors.ENDC}")
+            if user_input.lower() in ['quit', 'exit', 'q']:
+                break
 
-                    print(f"\n{Colors.GREEN}Llama:{Colors.ENDC} {answer}\n")
+            # Add user message to history
+            conversation_history.append({'role': 'user', 'content': user_input})
+            await run_turn(session, conversation_history, ollama_tools)
 
-                else:
-                    # No tool needed, just normal chat
-                    answer = response['message']['content']
-                    conversation_history.append(response['message'])
-                    print(f"\n{Colors.GREEN}Llama:{Colors.ENDC} {answer}\n")
+def read_prompts(path):
+    """Reads batch prompts from a JSONL file (or stdin for '-').
+
+    Each line is either {"id": ..., "prompt": "..."} or a bare JSON string. A malformed
+    line becomes an item with an "error" instead of stopping the batch, so it gets an
+    error record in the results like any failed prompt.
+    """
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    prompts = []
+    with stream:
+        for index, line in enumerate(stream):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                item = {"error": f"line {index + 1}: invalid JSON ({e})"}
+            if isinstance(item, str):
+                item = {"prompt": item}
+            elif not isinstance(item, dict):
+                item = {"error": f"line {index + 1}: expected an object or a string, got {type(item).__name__}"}
+            elif "error" not in item and not isinstance(item.get("prompt"), str):
+                item = {"id": item.get("id"), "error": f'line {index + 1}: missing or non-string "prompt"'}
+            if item.get("id") is None:
+                item["id"] = index
+            prompts.append(item)
+    return prompts
+
+async def run_batch(input_path, output_path, sessions, workers, server_url=None):
+    """Runs every prompt as an independent one-turn conversation and writes one JSONL result each.
+
+    `sessions` MCP sessions (spawned servers, or connections to `server_url`) are opened
+    once and shared round-robin by `workers` concurrent conversations (MCP sessions
+    multiplex concurrent requests).
+    """
+    prompts = read_prompts(input_path)
+    queue = asyncio.Queue()
+    for prompt in prompts:
+        queue.put_nowait(prompt)
+
+    out = sys.stdout if output_path == "-" else open(output_path, "w", encoding="utf-8")
+    done, failed = 0, 0
+    batch_start = time.perf_counter()
+
+    warm_up(ollama_async_client)
+    async with AsyncExitStack() as stack:
+        pool = [await open_session(stack, server_url) for _ in range(sessions)]
+        ollama_tools = await get_ollama_tools(pool[0])
+        transport = server_url or "stdio (one server process per session)"
+        print(f"{Colors.BLUE}Opened {len(pool)} MCP sessions via {transport}{Colors.ENDC}", file=sys.stderr)
+
+        async def worker(worker_id):
+            nonlocal done, failed
+            session = pool[worker_id % len(pool)]
+            while not queue.empty():
+                item = queue.get_nowait()
+                result = {"id": item["id"], "prompt": item.get("prompt")}
+                start_time = time.perf_counter()
+                try:
+                    if "error" in item:
+                        raise ValueError(item["error"])
+                    history = ConversationHistory()
+                    history.append({'role': 'user', 'content': item["prompt"]})
+                    message, turn = await run_turn(session, history, ollama_tools, echo=False)
+                    result.update(answer=message['content'], error=None, **turn)
+                except Exception as e:
+                    failed += 1
+                    result.update(answer=None, error=str(e))
+                result["total_seconds"] = time.perf_counter() - start_time
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+                done += 1
+                if done % 100 == 0:
+                    print(f"{Colors.BLUE}{done}/{len(prompts)} prompts done{Colors.ENDC}", file=sys.stderr)
+
+        await asyncio.gather(*(worker(i) for i in range(workers)))
+        server_stats = await read_server_stats(pool[0]) if server_url else None
+
+    if out is not sys.stdout:
+        out.close()
+    duration = time.perf_counter() - batch_start
+    print(f"{Colors.GREEN}Batch finished: {done} prompts ({failed} failed) in {duration:.1f}s "
+          f"({done / duration if duration else 0:.2f} prompts/s){Colors.ENDC}", file=sys.stderr)
+    if server_stats:
+        print(f"{Colors.BLUE}Shared server: {server_stats['active_sessions']} active sessions at the end of the batch, "
+              f"{server_stats['total_sessions']} since start{Colors.ENDC}", file=sys.stderr)
 
 if __name__ == "__main__":
-    try:
-        asyncio.run(run())
-    except KeyboardInterrupt:
-        print("\nGoodbye!")
\ No newline at end of file
+    ap = argparse.ArgumentParser(description="MCP chat client for Ollama")
+    ap.add_argument("--batch", type=str, help="Run headless: JSONL file of prompts ('-' for stdin)")
+    ap.add_argument("--output", type=str, default="-", help="JSONL results file for --batch (default: stdout)")
+    ap.add_argument("--sessions", type=int, default=2, help="MCP server sessions in the --batch pool")
+    ap.add_argument("--workers", type=int, default=8, help="Concurrent conversations in --batch mode")
+    ap.add_argument("--server-url", type=str, default=MCP_SERVER_URL,
+                    help="Join a shared MCP server (e.g. http://localhost:8000/mcp) instead of spawning one")
+    instrumentation.add_arguments(ap)
+    args = ap.parse_args()
+
+    with instrumentation.session(args, "client"):
+        try:
+            if args.batch:
+                asyncio.run(run_batch(args.batch, args.output, max(1, args.sessions), max(1, args.workers),
+                                      args.server_url))
+            else:
+                asyncio.run(run(args.server_url))
+        except KeyboardInterrupt:
+            print("\nGoodbye!")
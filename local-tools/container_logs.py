@@ -0,0 +1,117 @@
+import base64
+import json
+from datetime import datetime, timezone
+
+# Caps applied when the caller does not ask for anything smaller
+MAX_LINES = 500
+MAX_BYTES = 64 * 1024
+
+def parse_timestamp(value):
+    """Parses a Docker RFC3339Nano timestamp (or any ISO 8601 / unix seconds value) to nanoseconds."""
+    value = str(value).strip()
+    try:
+        return int(float(value) * 1_000_000_000)
+    except ValueError:
+        pass
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    # Docker emits up to 9 fractional digits, datetime only understands 6
+    nanos = 0
+    if "." in value:
+        head, rest = value.split(".", 1)
+        digits = rest[:len(rest) - len(rest.lstrip("0123456789"))]
+        value = head + rest[len(digits):]
+        nanos = int(digits.ljust(9, "0")[:9])
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp()) * 1_000_000_000 + nanos
+
+def position_since(value):
+    """Cursor position just before `value` (`since` is inclusive), never before the epoch."""
+    return max(0, parse_timestamp(value) - 1)
+
+def encode_cursor(container_id, ts_ns):
+    raw = json.dumps({"c": container_id[:12], "t": ts_ns}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """Returns (short container id, last seen timestamp in ns)."""
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    data = json.loads(raw)
+    return data["c"], int(data["t"])
+
+def open_stream(api, container_id, after_ns=None, tail="all", follow=False):
+    """Opens a timestamped log stream. `after_ns` is rounded down; callers drop the overlap.
+
+    Docker rejects a `since` of 0 or less, so positions at or before the epoch read from the start.
+    """
+    since = max(after_ns or 0, 0) // 1_000_000_000
+    return api.logs(container_id, stream=True, follow=follow, timestamps=True,
+                    since=since or None, tail=tail)
+
+def iter_lines(stream, after_ns=None):
+    """Yields (timestamp ns, text) for every complete line newer than `after_ns`."""
+    buffer = b""
+    for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            parsed = _parse_line(line)
+            if parsed and (after_ns is None or parsed[0] > after_ns):
+                yield parsed
+    if buffer:
+        parsed = _parse_line(buffer)
+        if parsed and (after_ns is None or parsed[0] > after_ns):
+            yield parsed
+
+def _parse_line(line):
+    text = line.decode("utf-8", errors="ignore").rstrip("\r")
+    stamp, _, message = text.partition(" ")
+    try:
+        return parse_timestamp(stamp), message
+    except ValueError:
+        return None
+
+def read_forward(stream, after_ns, max_lines, max_bytes):
+    """Reads the oldest lines after `after_ns` up to the caps and stops pulling from the daemon.
+
+    Returns (lines, last timestamp ns, whether more lines were left behind).
+    """
+    lines, used, last_ns = [], 0, after_ns
+    try:
+        for ts_ns, message in iter_lines(stream, after_ns):
+            size = len(message.encode()) + 1
+            if len(lines) >= max_lines or used + size > max_bytes:
+                return lines, last_ns, True
+            lines.append(message)
+            used += size
+            last_ns = ts_ns
+        return lines, last_ns, False
+    finally:
+        stream.close()
+
+def read_tail(stream, max_bytes):
+    """Keeps the newest lines of an already tail-limited stream that fit in `max_bytes`."""
+    try:
+        entries = list(iter_lines(stream))
+    finally:
+        stream.close()
+    kept, used = [], 0
+    for ts_ns, message in reversed(entries):
+        size = len(message.encode()) + 1
+        if used + size > max_bytes:
+            break
+        kept.append((ts_ns, message))
+        used += size
+    kept.reverse()
+    last_ns = entries[-1][0] if entries else None
+    return [m for _, m in kept], last_ns, len(kept) < len(entries)
+
+def fetch_tail(api, container_id, max_lines, max_bytes):
+    """The last `max_lines` lines of a container, trimmed to `max_bytes`."""
+    return read_tail(open_stream(api, container_id, tail=max_lines), max_bytes)
+
+def fetch_after(api, container_id, after_ns, max_lines, max_bytes):
+    """The first lines written after `after_ns`, up to the caps."""
+    return read_forward(open_stream(api, container_id, after_ns), after_ns, max_lines, max_bytes)
@@ -0,0 +1,138 @@
+import threading
+import time
+from clients import LazyModule
+
+# Imported on the first daemon request (see clients.LazyModule)
+docker = LazyModule("docker")
+
+# Container actions that can change what `list_docker_containers` shows
+CONTAINER_ACTIONS = {"create", "start", "restart", "stop", "die", "kill", "destroy",
+                     "rename", "pause", "unpause", "update"}
+IMAGE_ACTIONS = {"pull", "tag", "untag", "delete", "import", "load"}
+
+def format_ports(ports):
+    """Formats the `Ports` list of a container summary like `docker ps` does."""
+    parts = []
+    for p in ports or []:
+        if p.get("PublicPort"):
+            parts.append(f"{p.get('IP', '0.0.0.0')}:{p['PublicPort']}->{p['PrivatePort']}/{p['Type']}")
+        else:
+            parts.append(f"{p['PrivatePort']}/{p['Type']}")
+    return ", ".join(dict.fromkeys(parts)) or "none"
+
+class DockerState:
+    """In-process snapshot of running containers and image tags.
+
+    The snapshot is filled once with two daemon requests (containers + images)
+    and then kept current from the `docker events` stream on a background
+    thread. If the stream drops, the next read does a full resync.
+    """
+
+    def __init__(self):
+        self.client = None
+        self.containers = {}  # full id -> container summary dict
+        self.image_tags = {}  # image id -> list of repo tags
+        self.synced = False
+        self.resyncs = 0
+        self.events_seen = 0
+        self._lock = threading.Lock()
+        self._events = None
+
+    def _connect(self):
+        if self.client is None:
+            self.client = docker.from_env()
+        return self.client
+
+    def ensure_synced(self):
+        """Returns once the snapshot is current, resyncing if the stream is down."""
+        with self._lock:
+            if self.synced:
+                return
+            client = self._connect()
+            if self._events is not None:
+                self._events.close()
+            # Subscribe before listing so no change between the two is missed
+            self._events = client.events(
+                decode=True,
+                since=int(time.time()),
+                filters={"type": ["container", "image"]},
+            )
+            self._refresh_images()
+            self.containers = {c["Id"]: c for c in client.api.containers()}
+            self.synced = True
+            self.resyncs += 1
+            threading.Thread(target=self._watch, args=(self._events,), daemon=True).start()
+
+    def _watch(self, events):
+        try:
+            for event in events:
+                self._apply(event)
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                if self._events is events:
+                    self.synced = False
+
+    def _apply(self, event):
+        self.events_seen += 1
+        action = (event.get("Action") or event.get("status") or "").split(":")[0]
+        if event.get("Type") == "image":
+            if action in IMAGE_ACTIONS:
+                with self._lock:
+                    self._refresh_images()
+            return
+        if action not in CONTAINER_ACTIONS:
+            return
+        container_id = event.get("id") or event.get("Actor", {}).get("ID")
+        found = self.client.api.containers(filters={"id": container_id})
+        with self._lock:
+            if found:
+                self.containers[container_id] = found[0]
+                if found[0].get("ImageID") not in self.image_tags:
+                    self._refresh_images()
+            else:
+                self.containers.pop(container_id, None)
+
+    def _refresh_images(self):
+        self.image_tags = {i["Id"]: i.get("RepoTags") or [] for i in self.client.api.images()}
+
+    def list_running(self):
+        """Returns the cached running containers, sorted by name."""
+        self.ensure_synced()
+        with self._lock:
+            rows = []
+            for c in self.containers.values():
+                tags = [t for t in self.image_tags.get(c.get("ImageID"), []) if t != "<none>:<none>"]
+                rows.append({
+                    "id": c["Id"],
+                    "short_id": c["Id"][:12],
+                    "name": (c.get("Names") or ["/?"])[0].lstrip("/"),
+                    "image": tags[0] if tags else "none",
+                    "status": c.get("State", "unknown"),
+                    "ports": format_ports(c.get("Ports")),
+                })
+        return sorted(rows, key=lambda r: r["name"])
+
+    def resolve(self, name_or_id):
+        """Maps a name, short id or full id to a full container id from the snapshot.
+
+        An exact name or id wins over an id prefix (a container may be named like another's
+        id prefix); a prefix shared by several containers resolves to nothing.
+        """
+        if not name_or_id:
+            return None, None
+        rows = self.list_running()
+        for row in rows:
+            if name_or_id in (row["name"], row["short_id"], row["id"]):
+                return row["id"], row["name"]
+        prefixed = [row for row in rows if row["id"].startswith(name_or_id)]
+        if len(prefixed) == 1:
+            return prefixed[0]["id"], prefixed[0]["name"]
+        return None, None
+
+    def close(self):
+        if self._events is not None:
+            self._events.close()
+        if self.client is not None:
+            self.client.close()
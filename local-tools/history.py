@@ -0,0 +1,89 @@
+import json
+import os
+
+# History configuration (token counts are estimates: ~4 characters per token)
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "6000"))
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "3"))
+OLD_TOOL_OUTPUT_CHARS = int(os.getenv("OLD_TOOL_OUTPUT_CHARS", "400"))
+
+def tool_result_text(result):
+    """Extracts the text the model should see from an MCP CallToolResult."""
+    parts = []
+    for item in result.content:
+        if getattr(item, "type", None) == "text":
+            parts.append(item.text)
+        elif getattr(item, "type", None) == "resource" and hasattr(item.resource, "text"):
+            parts.append(item.resource.text)
+        else:
+            parts.append(f"[{getattr(item, 'type', 'unknown')} content omitted]")
+    text = "\n".join(parts)
+    return f"Tool error: {text}" if result.isError else text
+
+def estimate_tokens(message):
+    content = message.get('content') or ""
+    tokens = len(content) // 4 + 4
+    for tool_call in message.get('tool_calls') or []:
+        function = tool_call['function']
+        tokens += (len(function['name']) + len(json.dumps(dict(function['arguments'])))) // 4
+    return tokens
+
+def compact_tool_output(message, limit):
+    content = message['content']
+    if len(content) <= limit:
+        return message
+    return {**message, 'content': f"{content[:limit]}\n…[{len(content) - limit} chars of old tool output truncated]"}
+
+class ConversationHistory:
+    """Full conversation log plus a token-budgeted view of it for each model call.
+
+    The last `keep_turns` turns are sent verbatim. Tool outputs of older turns are
+    truncated, and if that is still over budget the oldest turns are dropped whole
+    (so a tool result never loses the assistant message that asked for it).
+    """
+
+    def __init__(self, budget=HISTORY_TOKEN_BUDGET, keep_turns=HISTORY_KEEP_TURNS,
+                 old_tool_chars=OLD_TOOL_OUTPUT_CHARS):
+        self.messages = []
+        self.budget = budget
+        self.keep_turns = keep_turns
+        self.old_tool_chars = old_tool_chars
+
+    def append(self, message):
+        self.messages.append(message)
+
+    def _turns(self):
+        turns = []
+        for message in self.messages:
+            if message['role'] == 'user' or not turns:
+                turns.append([])
+            turns[-1].append(message)
+        return turns
+
+    def build(self):
+        """Returns (messages to send, stats) where stats holds full/sent/saved token estimates."""
+        turns = self._turns()
+        split = max(len(turns) - self.keep_turns, 0)
+        older = [[compact_tool_output(m, self.old_tool_chars) if m['role'] == 'tool' else m for m in turn]
+                 for turn in turns[:split]]
+        recent = turns[split:]
+
+        def size(turn_list):
+            return sum(estimate_tokens(m) for turn in turn_list for m in turn)
+
+        dropped = 0
+        while older and size(older) + size(recent) > self.budget:
+            older.pop(0)
+            dropped += 1
+
+        view = [m for turn in older + recent for m in turn]
+        if dropped:
+            view.insert(0, {'role': 'system', 'content': f"[{dropped} earlier turns omitted to fit the context budget]"})
+
+        full_tokens = sum(estimate_tokens(m) for m in self.messages)
+        sent_tokens = sum(estimate_tokens(m) for m in view)
+        return view, {
+            'full_tokens': full_tokens,
+            'sent_tokens': sent_tokens,
+            'saved_tokens': max(full_tokens - sent_tokens, 0),
+            'dropped_turns': dropped,
+        }
@@ -0,0 +1,114 @@
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from mcp.server.fastmcp import Context
+
+TOOL_CACHE_SIZE = int(os.getenv("TOOL_CACHE_SIZE", "512"))
+
+class ResultCache:
+    """LRU cache of tool results with a TTL per entry and hit/miss counters."""
+
+    def __init__(self, max_entries=TOOL_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (expires_at, value)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return False, None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def put(self, key, value, ttl):
+        if ttl <= 0:
+            return
+        with self._lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+cache = ResultCache()
+
+def _normalize(value):
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    return value
+
+def cacheable(ttl, key=None, store=None):
+    """Declares a tool idempotent: results are reused for `ttl` seconds.
+
+    The cache key is the tool name plus its normalized arguments (defaults applied,
+    strings stripped, the MCP `Context` ignored). `key` may map the arguments dict
+    to something more canonical. `store(result)` returning False keeps a result out
+    of the cache (e.g. a failure that should be retried). Tools without this
+    decorator are never cached.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        def make_key(args, kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = _normalize({name: value for name, value in bound.arguments.items()
+                                    if not isinstance(value, Context)})
+            if key is not None:
+                arguments = key(arguments)
+            return fn.__name__ + ":" + json.dumps(arguments, sort_keys=True, default=str)
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                cache_key = make_key(args, kwargs)
+                hit, value = cache.get(cache_key)
+                if hit:
+                    return value
+                value = await fn(*args, **kwargs)
+                if store is None or store(value):
+                    cache.put(cache_key, value, ttl)
+                return value
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                cache_key = make_key(args, kwargs)
+                hit, value = cache.get(cache_key)
+                if hit:
+                    return value
+                value = fn(*args, **kwargs)
+                if store is None or store(value):
+                    cache.put(cache_key, value, ttl)
+                return value
+
+        wrapper.cache_ttl = ttl
+        return wrapper
+    return decorator
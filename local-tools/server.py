@@ -1,73 +1,453 @@
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import sys
 import time
-import docker
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
 import httpx
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
+from mcp.types import CallToolResult, TextContent
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from clients import LazyModule, warm_up
+import instrumentation
+from instrumentation import percentile, span, traced
+import container_logs
+from docker_state import DockerState
+from result_cache import cache, cacheable
+
+# Only needed once a Docker tool runs; keeps the SDK import out of server start-up
+docker = LazyModule("docker")
+
+# HTTP client configuration (shared by all website checks)
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "3.0"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+# HTTP/2 needs the optional `h2` package (pip install "httpx[http2]")
+HTTP2 = os.getenv("HTTP2", "0") == "1" and importlib.util.find_spec("h2") is not None
+CHECK_CONCURRENCY = int(os.getenv("CHECK_CONCURRENCY", "50"))
+MAX_PROBES = 20
+FOLLOW_MAX_SECONDS = float(os.getenv("FOLLOW_MAX_SECONDS", "60"))
+# How long website check results are reused for identical calls (0 disables)
+WEBSITE_CACHE_TTL = float(os.getenv("WEBSITE_CACHE_TTL", "5"))
+
+@dataclass
+class AppContext:
+    http: httpx.AsyncClient
+    docker: DockerState
+
+@dataclass
+class ServerStats:
+    transport: str = "stdio"
+    started_at: float = field(default_factory=time.time)
+    active_sessions: int = 0
+    total_sessions: int = 0
+
+stats = ServerStats()
+shared = None  # AppContext shared by every session of this process
+
+def create_app_context():
+    http = httpx.AsyncClient(
+        verify=False,
+        http2=HTTP2,
+        timeout=HTTP_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        ),
+    )
+    return AppContext(http=http, docker=DockerState())
+
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    """Hands every MCP session the long-lived resources of this process.
+
+    FastMCP enters the lifespan once per session. Over stdio that is once per process,
+    over HTTP it is once per connected client, so the resources are created on the
+    first session and shared by all later ones. Over stdio they are closed with the
+    last session; network servers keep them for the life of the process.
+    """
+    global shared
+    if shared is None:
+        shared = create_app_context()
+        # Load the Docker SDK and take the container snapshot while the client is still initializing
+        warm_up(shared.docker.ensure_synced)
+    stats.active_sessions += 1
+    stats.total_sessions += 1
+    log(f"session opened (active={stats.active_sessions}, total={stats.total_sessions})")
+    try:
+        yield shared
+    finally:
+        stats.active_sessions -= 1
+        log(f"session closed (active={stats.active_sessions}, total={stats.total_sessions})")
+        if stats.active_sessions == 0 and stats.transport == "stdio":
+            app, shared = shared, None
+            await app.http.aclose()
+            app.docker.close()
+
+def log(message):
+    # stdout carries the protocol over stdio, so diagnostics go to stderr
+    print(f"[sysadmin_dashboard] {message}", file=sys.stderr, flush=True)
 
 # Initialize Server
-mcp = FastMCP("sysadmin_dashboard")
+mcp = FastMCP("sysadmin_dashboard", lifespan=lifespan)
+
+def normalize_url(url: str) -> str:
+    target = url.strip()
+    if not target.startswith("http"):
+        target = f"https://{target}"
+    return target
+
+def summarize(values):
+    if not values:
+        return None
+    return {"p50": round(percentile(values, 50), 2), "p95": round(percentile(values, 95), 2), "max": round(max(values), 2)}
+
+async def probe(http: httpx.AsyncClient, target: str) -> dict:
+    """Runs a single GET against `target` and returns the outcome as a dict.
+
+    Times are monotonic milliseconds. `phases` holds the connect/TLS/TTFB parts that
+    httpcore reported for this request (connect and TLS are absent on a reused connection).
+    """
+    marks = {}
+
+    async def trace(event, info):
+        # e.g. "connection.connect_tcp.started" -> "connect_tcp.started"
+        marks[event.split(".", 1)[1]] = time.perf_counter()
+
+    def phase(name, start="started", end="complete"):
+        if f"{name}.{start}" in marks and f"{name}.{end}" in marks:
+            return round((marks[f"{name}.{end}"] - marks[f"{name}.{start}"]) * 1000, 2)
+        return None
+
+    try:
+        start_time = time.perf_counter()
+        with span("http.probe", url=target) as probe_span:
+            response = await http.get(target, extensions={"trace": trace})
+            probe_span.set(status=response.status_code)
+        duration = (time.perf_counter() - start_time) * 1000
+        phases = {"connect_ms": phase("connect_tcp"), "tls_ms": phase("start_tls")}
+        if "send_request_headers.started" in marks and "receive_response_headers.complete" in marks:
+            phases["ttfb_ms"] = round((marks["receive_response_headers.complete"] - marks["send_request_headers.started"]) * 1000, 2)
+        return {"url": target, "ok": True, "status": response.status_code,
+                "reason": response.reason_phrase, "time_ms": round(duration, 2),
+                "phases": {k: v for k, v in phases.items() if v is not None}}
+    except httpx.TimeoutException:
+        return {"url": target, "ok": False, "error": f"TIMEOUT (exceeded {HTTP_TIMEOUT:g}s)"}
+    except Exception as e:
+        return {"url": target, "ok": False, "error": f"ERROR: {str(e)}"}
+
+async def resolve_ms(target: str) -> float | None:
+    """Time of a DNS lookup for the target host (the OS resolver cache applies)."""
+    url = httpx.URL(target)
+    try:
+        start_time = time.perf_counter()
+        with span("dns.resolve", host=url.host):
+            await asyncio.get_running_loop().getaddrinfo(url.host, url.port or (443 if url.scheme == "https" else 80))
+        return round((time.perf_counter() - start_time) * 1000, 2)
+    except OSError:
+        return None
+
+async def probe_series(target: str, probes: int) -> dict:
+    """Runs `probes` sequential GETs over one fresh keep-alive connection.
+
+    The first probe pays for connect + TLS, the rest show the steady-state TTFB.
+    """
+    dns_ms = await resolve_ms(target)
+    async with httpx.AsyncClient(verify=False, http2=HTTP2, timeout=HTTP_TIMEOUT,
+                                 limits=httpx.Limits(max_connections=1)) as http:
+        samples = [await probe(http, target) for _ in range(probes)]
+
+    ok = [r for r in samples if r["ok"]]
+    report = {"url": target, "ok": bool(ok), "probes": probes, "failures": probes - len(ok), "dns_ms": dns_ms}
+    if not ok:
+        report["error"] = samples[-1]["error"]
+        return report
+    connects = [r["phases"]["connect_ms"] for r in ok if "connect_ms" in r["phases"]]
+    tls = [r["phases"]["tls_ms"] for r in ok if "tls_ms" in r["phases"]]
+    report.update({
+        "status": ok[-1]["status"],
+        "reason": ok[-1]["reason"],
+        "connections_opened": len(connects),
+        "connect_ms": summarize(connects),
+        "tls_ms": summarize(tls),
+        "ttfb_ms": summarize([r["phases"]["ttfb_ms"] for r in ok if "ttfb_ms" in r["phases"]]),
+        "total_ms": summarize([r["time_ms"] for r in ok]),
+    })
+    return report
+
+def format_series(report: dict) -> str:
+    def ms(value):
+        return f"{value:.0f}ms" if value is not None else "n/a"
+
+    def triple(stats):
+        return f"{stats['p50']:.0f}/{stats['p95']:.0f}/{stats['max']:.0f}ms" if stats else "n/a"
+
+    if not report["ok"]:
+        return f"❌ Site: {report['url']} - {report['error']} ({report['probes']} probes failed)"
+    connect = report["connect_ms"]["p50"] if report["connect_ms"] else None
+    tls = report["tls_ms"]["p50"] if report["tls_ms"] else None
+    return (f"✅ Site: {report['url']}\n"
+            f"   Status: {report['status']} {report['reason']} "
+            f"({report['probes'] - report['failures']}/{report['probes']} probes ok, "
+            f"{report['connections_opened']} connection(s))\n"
+            f"   DNS: {ms(report['dns_ms'])} | Connect: {ms(connect)} | TLS: {ms(tls)}\n"
+            f"   TTFB p50/p95/max: {triple(report['ttfb_ms'])}\n"
+            f"   Total p50/p95/max: {triple(report['total_ms'])}")
 
 # --- TOOL 1: Fast Website Checker ---
 @mcp.tool()
-async def check_website_status(url: str) -> str:
-    """Checks if a website is reachable. Fast timeout (3s).
+@traced("tool.check_website_status")
+@cacheable(ttl=WEBSITE_CACHE_TTL, key=lambda args: {"url": normalize_url(args["url"]), "probes": args["probes"]},
+           store=lambda result: result.structuredContent["ok"] and not result.structuredContent.get("failures"))
+async def check_website_status(url: str, ctx: Context, probes: int = 1) -> CallToolResult:
+    """Checks if a website is reachable. Each request gives up after the server's HTTP_TIMEOUT (default 3s).
+
+    With probes > 1 it runs that many requests over one reused connection and reports
+    DNS / connect / TLS / time-to-first-byte plus p50/p95/max latency.
     
     Args:
         url: The URL to check (e.g. 'upatras.gr' or 'uop.gr').
+        probes: Number of requests to time (1-20, default 1).
     """
-    target = url.strip()
-    if not target.startswith("http"):
-        target = f"https://{target}"
+    target = normalize_url(url)
+    probes = max(1, min(probes, MAX_PROBES))
+    if probes > 1:
+        report = await probe_series(target, probes)
+        text = format_series(report)
+    else:
+        report = await probe(ctx.request_context.lifespan_context.http, target)
+        if not report["ok"]:
+            text = f"❌ Site: {report['url']} - {report['error']}"
+        else:
+            text = (f"✅ Site: {report['url']}\n"
+                    f"   Status: {report['status']} {report['reason']}\n"
+                    f"   Time: {report['time_ms'] / 1000:.2f}s")
+    return CallToolResult(content=[TextContent(type="text", text=text)], structuredContent=report)
+
+@mcp.tool()
+@traced("tool.check_websites_status")
+# Keyed in request order (the table follows it); tables with a TIMEOUT/ERROR row are not reused
+@cacheable(ttl=WEBSITE_CACHE_TTL, key=lambda args: {"urls": list(dict.fromkeys(normalize_url(u) for u in args["urls"]))},
+           store=lambda report: "❌" not in report)
+async def check_websites_status(urls: list[str], ctx: Context) -> str:
+    """Checks many websites concurrently and returns one compact table.
     
-    try:
-        async with httpx.AsyncClient(verify=False) as client:
-            start_time = time.time()
-            response = await client.get(target, timeout=3.0)
-            duration = time.time() - start_time
-            
-            return (f"✅ Site: {target}\n"
-                    f"   Status: {response.status_code} {response.reason_phrase}\n"
-                    f"   Time: {duration:.2f}s")
-    except httpx.TimeoutException:
-        return f"❌ Site: {target} - TIMEOUT (exceeded 3s)"
-    except Exception as e:
-        return f"❌ Site: {target} - ERROR: {str(e)}"
+    Args:
+        urls: The URLs to check (e.g. ['upatras.gr', 'uop.gr']).
+    """
+    http = ctx.request_context.lifespan_context.http
+    semaphore = asyncio.Semaphore(CHECK_CONCURRENCY)
+
+    async def bounded_probe(target):
+        async with semaphore:
+            return await probe(http, target)
+
+    targets = list(dict.fromkeys(normalize_url(u) for u in urls))
+    if not targets:
+        return "No URLs given."
+
+    start_time = time.perf_counter()
+    results = await asyncio.gather(*(bounded_probe(t) for t in targets))
+    duration = time.perf_counter() - start_time
+
+    width = max(len(r["url"]) for r in results)
+    report = f"🌐 Checked {len(results)} sites in {duration:.2f}s\n"
+    for r in results:
+        if r["ok"]:
+            report += f"✅ {r['url']:<{width}} | {r['status']} | {r['time_ms'] / 1000:.2f}s\n"
+        else:
+            report += f"❌ {r['url']:<{width}} | {r['error']}\n"
+    up = sum(1 for r in results if r["ok"])
+    report += f"Up: {up} | Down: {len(results) - up}"
+    return report
 
 # --- TOOL 2: Docker Inspector ---
+# Not cacheable: the snapshot is already in memory and event-driven, a TTL would only add staleness
 @mcp.tool()
-def list_docker_containers() -> str:
+@traced("tool.list_docker_containers")
+def list_docker_containers(ctx: Context) -> str:
     """Lists all running Docker containers on the host machine."""
     try:
-        client = docker.from_env()
-        containers = client.containers.list()
+        containers = ctx.request_context.lifespan_context.docker.list_running()
         
         if not containers:
             return "No containers are currently running."
         
         report = "🐳 Running Containers:\n"
         for c in containers:
-            report += f"- [{c.short_id}] {c.name} (Image: {c.image.tags[0] if c.image.tags else 'none'})\n"
-            report += f"  Status: {c.status} | Ports: {c.ports}\n"
+            report += f"- [{c['short_id']}] {c['name']} (Image: {c['image']})\n"
+            report += f"  Status: {c['status']} | Ports: {c['ports']}\n"
             
         return report
     except Exception as e:
         return f"Error connecting to Docker: {e}"
 
+# Not cacheable: cursors and follow mode make every call unique
 @mcp.tool()
-def get_container_logs(container_name_or_id: str) -> str:
-    """Fetches the last 20 lines of logs from a specific container.
-    
+@traced("tool.get_container_logs")
+async def get_container_logs(
+    container_name_or_id: str,
+    ctx: Context,
+    since: str | None = None,
+    cursor: str | None = None,
+    max_lines: int = 20,
+    max_bytes: int = 16384,
+    follow_seconds: float = 0,
+) -> str:
+    """Fetches logs from a specific container, incrementally if a cursor is given.
+
+    Without `since`/`cursor` it returns the last `max_lines` lines. Every answer ends
+    with a cursor; pass it back to get only the lines written after that point.
+
     Args:
         container_name_or_id: The name or short ID of the container.
+        since: Only lines from this time on (ISO 8601 like '2024-05-01T10:00:00Z' or unix seconds).
+        cursor: The cursor returned by a previous call; continues right after it.
+        max_lines: Maximum number of lines to return (default 20).
+        max_bytes: Maximum number of bytes of log text to return (default 16384).
+        follow_seconds: If > 0, wait up to this many seconds for new lines, streamed as progress
+            notifications when the caller asked for progress and returned in the result otherwise.
     """
+    max_lines = max(1, min(max_lines, container_logs.MAX_LINES))
+    max_bytes = max(1, min(max_bytes, container_logs.MAX_BYTES))
     try:
-        client = docker.from_env()
-        container = client.containers.get(container_name_or_id)
-        logs = container.logs(tail=20).decode('utf-8', errors='ignore')
-        return f"📋 Logs for {container.name}:\n{logs}"
+        state = ctx.request_context.lifespan_context.docker
+        container_id, name = await asyncio.to_thread(state.resolve, container_name_or_id)
+        if container_id is None:
+            # Not running (or not in the snapshot yet): ask the daemon directly
+            container = await asyncio.to_thread(state.client.containers.get, container_name_or_id)
+            container_id, name = container.id, container.name
+
+        after_ns = None
+        if cursor:
+            cursor_container, after_ns = container_logs.decode_cursor(cursor)
+            if not container_id.startswith(cursor_container):
+                return f"Cursor does not belong to container '{container_name_or_id}'."
+        elif since:
+            after_ns = container_logs.position_since(since)
+
+        if follow_seconds > 0:
+            return await follow_container_logs(ctx, state, container_id, name, after_ns,
+                                               max_lines, max_bytes, follow_seconds)
+
+        with span("docker.logs", mode="tail" if after_ns is None else "after") as logs_span:
+            if after_ns is None:
+                lines, last_ns, truncated = await asyncio.to_thread(
+                    container_logs.fetch_tail, state.client.api, container_id, max_lines, max_bytes)
+                note = ", older lines cut by max_bytes" if truncated else ""
+            else:
+                lines, last_ns, truncated = await asyncio.to_thread(
+                    container_logs.fetch_after, state.client.api, container_id, after_ns, max_lines, max_bytes)
+                note = ", more available: call again with the cursor" if truncated else ""
+            logs_span.set(lines=len(lines))
+
+        next_ns = last_ns if last_ns is not None else (after_ns if after_ns is not None else time.time_ns())
+        header = f"📋 Logs for {name} ({len(lines)} lines{note})"
+        logs = "\n".join(lines) if lines else "(no new lines)"
+        return f"{header}:\n{logs}\n🔖 Cursor: {container_logs.encode_cursor(container_id, next_ns)}"
     except docker.errors.NotFound:
         return f"Container '{container_name_or_id}' not found."
+    except ValueError as e:
+        return f"Invalid since/cursor value: {e}"
     except Exception as e:
         return f"Error reading logs: {e}"
 
+async def follow_container_logs(ctx, state, container_id, name, after_ns, max_lines, max_bytes, follow_seconds):
+    """Follows new log lines until the time or size budget runs out.
+
+    Lines go out as MCP progress notifications when the request carries a progress
+    token; without one report_progress() drops them, so they are returned in the
+    result instead (same max_lines/max_bytes caps). Either way the cursor only moves
+    past lines the caller received.
+    """
+    follow_seconds = min(follow_seconds, FOLLOW_MAX_SECONDS)
+    meta = ctx.request_context.meta
+    streaming = meta is not None and meta.progressToken is not None
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stream = await asyncio.to_thread(container_logs.open_stream, state.client.api, container_id,
+                                     after_ns, "all" if after_ns is not None else 0, True)
+
+    def pump():
+        try:
+            for entry in container_logs.iter_lines(stream, after_ns):
+                loop.call_soon_threadsafe(queue.put_nowait, entry)
+        except Exception:
+            pass
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    reader = loop.run_in_executor(None, pump)
+    deadline = loop.time() + follow_seconds
+    count, used, last_ns, capped = 0, 0, after_ns, False
+    lines = []
+    try:
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                entry = await asyncio.wait_for(queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if entry is None:
+                break
+            ts_ns, message = entry
+            size = len(message.encode()) + 1
+            if count >= max_lines or used + size > max_bytes:
+                capped = True
+                break
+            count += 1
+            used += size
+            last_ns = ts_ns
+            if streaming:
+                await ctx.report_progress(count, message=message)
+            else:
+                lines.append(message)
+    finally:
+        stream.close()
+        await reader
+
+    next_ns = last_ns if last_ns is not None else time.time_ns()
+    reason = "size cap reached" if capped else f"followed for up to {follow_seconds:g}s"
+    cursor = f"🔖 Cursor: {container_logs.encode_cursor(container_id, next_ns)}"
+    if streaming:
+        return f"📋 Streamed {count} lines from {name} as progress notifications ({reason}).\n{cursor}"
+    logs = "\n".join(lines) if lines else "(no new lines)"
+    return f"📋 Followed {name}: {count} new lines ({reason}):\n{logs}\n{cursor}"
+
+# --- Server statistics (resources, not exposed to the model as tools) ---
+@mcp.resource("stats://cache")
+def cache_stats() -> str:
+    """Hit/miss counters of the tool result cache."""
+    return json.dumps(cache.stats())
+
+@mcp.resource("stats://server")
+def server_stats() -> str:
+    """Transport, uptime and session counts of this server process."""
+    return json.dumps({
+        "transport": stats.transport,
+        "uptime_seconds": round(time.time() - stats.started_at, 1),
+        "active_sessions": stats.active_sessions,
+        "total_sessions": stats.total_sessions,
+    })
+
 if __name__ == "__main__":
-    mcp.run()
\ No newline at end of file
+    ap = argparse.ArgumentParser(description="sysadmin_dashboard MCP server")
+    ap.add_argument("--transport", choices=["stdio", "streamable-http", "sse"], default="stdio",
+                    help="stdio (one client, spawned by it) or a long-lived network server shared by many clients")
+    ap.add_argument("--host", type=str, default=os.getenv("MCP_HOST", "127.0.0.1"), help="Bind address for network transports")
+    ap.add_argument("--port", type=int, default=int(os.getenv("MCP_PORT", "8000")), help="Port for network transports")
+    instrumentation.add_arguments(ap)
+    args = ap.parse_args()
+
+    stats.transport = args.transport
+    if args.transport != "stdio":
+        mcp.settings.host = args.host
+        mcp.settings.port = args.port
+        path = mcp.settings.streamable_http_path if args.transport == "streamable-http" else mcp.settings.sse_path
+        log(f"serving {args.transport} on http://{args.host}:{args.port}{path}")
+    # Summaries go to stderr, so tracing is safe over stdio too
+    with instrumentation.session(args, "server"):
+        mcp.run(transport=args.transport)
\ No newline at end of file
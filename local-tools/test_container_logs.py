@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import container_logs
+
+class RecordingAPI:
+    """Stands in for docker's APIClient and keeps the arguments of the logs() call."""
+
+    def logs(self, container_id, **kwargs):
+        self.kwargs = kwargs
+        return iter([])
+
+@pytest.mark.parametrize("since, expected", [
+    ("0", 0),
+    ("-5", 0),
+    ("1970-01-01T00:00:00Z", 0),
+    ("1969-12-31T23:59:59Z", 0),
+    ("1", 999_999_999),
+    ("2024-05-01T10:00:00Z", 1_714_557_599_999_999_999),
+])
+def test_position_since_never_before_epoch(since, expected):
+    assert container_logs.position_since(since) == expected
+
+@pytest.mark.parametrize("after_ns, expected", [
+    (None, None),
+    (-1, None),
+    (0, None),
+    (999_999_999, None),
+    (1_714_557_599_999_999_999, 1_714_557_599),
+])
+def test_open_stream_only_passes_positive_since(after_ns, expected):
+    api = RecordingAPI()
+    container_logs.open_stream(api, "abc", after_ns)
+    assert api.kwargs["since"] == expected
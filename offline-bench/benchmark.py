@@ -0,0 +1,305 @@
+"""
+End-to-end benchmark of the sub-projects against the fake backends.
+
+Each scenario runs a real entry point as a subprocess, pointed at in-process fakes
+through its usual environment (OLLAMA_HOST, OPENAI_BASE_URL, DOCKER_HOST), with
+`--trace` on. Throughput is the steady-state completion rate read from the trace,
+after the first request (whose one-off start-up cost startup.py measures); latencies are
+p95 of the named spans over the same steady part of the run. Results can be saved as the baseline and later runs are
+compared against it, exiting 1 when a metric regressed by more than the tolerance.
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(HERE)
+sys.path.insert(0, REPO)
+from helpers import Colors
+from instrumentation import percentile
+import serve
+
+BASELINE_PATH = os.path.join(HERE, "baselines.json")
+# Latency changes smaller than this are scheduler noise, whatever the percentage
+MIN_DELTA_MS = 5.0
+# Below this many spans a p95 is the slowest sample or two: reported, but not gated on
+MIN_GATED_SAMPLES = 20
+# Reported but not gated: the OS spawning `ls`, a few ms that jitter by 10+ ms between identical runs
+UNGATED = {"p95_subprocess_ms"}
+SCENARIOS = ["local-tools", "file-search-upload", "file-search-chat", "local-shell"]
+
+def read_trace(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def active_seconds(spans):
+    """Seconds from the first span start to the last span end."""
+    if not spans:
+        return 0.0
+    return max(s["start"] + s["ms"] / 1000 for s in spans) - min(s["start"] for s in spans)
+
+def p95(spans, name):
+    values = sorted(s["ms"] for s in spans if s["name"] == name)
+    return round(percentile(values, 95), 1) if values else None
+
+def p95_metrics(spans, **names):
+    """{metric: p95 of the spans called names[metric]}, plus their counts under "samples"."""
+    metrics = {metric: p95(spans, name) for metric, name in names.items()}
+    metrics["samples"] = {metric: count(spans, name) for metric, name in names.items()}
+    return metrics
+
+def count(spans, name):
+    return sum(s["name"] == name for s in spans)
+
+def rate(n, seconds):
+    return round(n / seconds, 2) if seconds else 0.0
+
+def steady_rate(spans, name, counted=None):
+    """Completions per second after the first `name` span finished.
+
+    The first request of a process also pays one-off costs (imports, connection
+    set-up, MCP server start), which startup.py measures; leaving it out keeps this a
+    throughput figure.
+    `counted` names the spans to count instead (e.g. tool calls within turns).
+    """
+    ends = sorted(s["start"] + s["ms"] / 1000 for s in spans if s["name"] == name)
+    if len(ends) < 2:
+        return 0.0
+    first, last = ends[0], ends[-1]
+    n = len(ends) - 1 if counted is None else sum(
+        1 for s in spans if s["name"] == counted and first < s["start"] + s["ms"] / 1000 <= last)
+    return rate(n, last - first)
+
+def steady_spans(spans, name):
+    """The spans that started after the first `name` span finished.
+
+    Requests started alongside the first one share its one-off costs, so with several
+    workers they are a whole cold wave, enough to set the p95 on their own.
+    """
+    ends = [s["start"] + s["ms"] / 1000 for s in spans if s["name"] == name]
+    return [s for s in spans if s["start"] >= min(ends)] if ends else spans
+
+def run_entry_point(script, args, env, trace, stdin=None, timeout=600):
+    """Runs a repo script with tracing on; returns (stdout, spans)."""
+    result = subprocess.run([sys.executable, script, *args, "--trace", trace], cwd=REPO, env=env, input=stdin,
+                            capture_output=True, text=True, timeout=timeout)
+    if result.returncode != 0:
+        raise RuntimeError(f"{script} exited with {result.returncode}:\n{result.stderr[-2000:]}")
+    return result.stdout, read_trace(trace)
+
+# --- scenarios ---
+
+def bench_local_tools(env, work, opts, servers):
+    """Headless batch of one-turn conversations through the MCP client and server."""
+    site = servers["ollama"].url
+    templates = [
+        f"Is {site}/api/version up?",
+        f"Check {site}/api/version and {site}/api/tags",
+        "Which containers are running?",
+        "Show the logs of web-{n}",
+        "Say hello",
+    ]
+    prompts = os.path.join(work, "prompts.jsonl")
+    with open(prompts, "w", encoding="utf-8") as f:
+        for n in range(opts.prompts):
+            f.write(json.dumps({"id": n, "prompt": templates[n % len(templates)].format(n=n % 20 + 1)}) + "\n")
+    output = os.path.join(work, "results.jsonl")
+    _, spans = run_entry_point("local-tools/client.py",
+                               ["--batch", prompts, "--output", output, "--sessions", "2", "--workers", "8"],
+                               env, os.path.join(work, "local-tools.jsonl"))
+    with open(output, encoding="utf-8") as f:
+        results = [json.loads(line) for line in f]
+    failed = sum(r["error"] is not None for r in results)
+    if failed:
+        raise RuntimeError(f"{failed} of {len(results)} prompts failed: {next(r['error'] for r in results if r['error'])}")
+    return {
+        "turns_per_s": steady_rate(spans, "turn"),
+        "tool_calls_per_s": steady_rate(spans, "turn", "tool.call"),
+        **p95_metrics(steady_spans(spans, "turn"), p95_turn_ms="turn", p95_model_chat_ms="model.chat",
+                      p95_tool_call_ms="tool.call"),
+    }
+
+def bench_upload(env, work, opts, servers):
+    """Uploads a directory of text files into a new vector store and waits for ingestion."""
+    docs = os.path.join(work, "docs")
+    os.makedirs(docs)
+    for n in range(opts.files):
+        with open(os.path.join(docs, f"doc_{n:04d}.txt"), "w", encoding="utf-8") as f:
+            f.write(f"Document {n}. " + "The refund policy allows returns within thirty days. " * 40)
+    env = {**env, "UPLOAD_MANIFEST": os.path.join(work, "manifest.sqlite"),
+           "LOCAL_INDEX_DIR": os.path.join(work, "local_index")}
+    _, spans = run_entry_point("openai-file-search/00_upload_file.py",
+                               ["--dir", docs, "--store", "offline-bench", "--local-index"],
+                               env, os.path.join(work, "upload.jsonl"))
+    seconds = active_seconds(spans)
+    return {
+        # Whole-run rate: uploads overlap, and attach/ingestion are part of getting files in
+        "files_per_s": rate(count(spans, "upload"), seconds),
+        **p95_metrics(spans, p95_upload_ms="upload", p95_attach_ms="attach"),
+    }
+
+def bench_chat(env, work, opts, servers):
+    """Questions to the file_search chat client, three per conversation."""
+    state = servers["openai"].state
+    store_id = next((s for s, store in state.stores.items() if store["name"] == "offline-bench"), None)
+    if store_id is None:
+        raise RuntimeError("no vector store to chat with (run the file-search-upload scenario first)")
+    lines = []
+    for n in range(opts.turns):
+        if n and n % 3 == 0:
+            lines.append("new")
+        lines.append(f"Question {n}: what does the refund policy say?")
+    env = {**env, "OPENAI_VECTOR_STORE_ID": store_id, "ANSWER_CACHE": os.path.join(work, "answers.sqlite")}
+    _, spans = run_entry_point("openai-file-search/10_file_search_client.py", [], env,
+                               os.path.join(work, "chat.jsonl"), stdin="\n".join(lines + ["quit"]) + "\n")
+    return {
+        "turns_per_s": steady_rate(spans, "model.response"),
+        **p95_metrics(steady_spans(spans, "model.response"), p95_model_response_ms="model.response"),
+    }
+
+def bench_local_shell(env, work, opts, servers):
+    """Shell turns: the model proposes commands, the batch is approved, outputs go back.
+
+    The first chained request is rejected, so every run also covers the full-resend fallback.
+    """
+    lines = []
+    for n in range(opts.turns):
+        lines += [f"Task {n}: list the files", "y"]
+    servers["openai"].reject_chained = 1
+    stdout, spans = run_entry_point("openai-local-shell/00_local_shell_client.py", [], env,
+                                    os.path.join(work, "shell.jsonl"), stdin="\n".join(lines + ["quit"]) + "\n")
+    # The journal goes to the repo's logs/ like any session; don't leave benchmark sessions behind
+    journal = re.search(r"Session journal: (\S+\.jsonl)", stdout)
+    if journal and os.path.exists(journal.group(1)):
+        os.remove(journal.group(1))
+    # A turn is the request that proposes the commands plus the one that reports their outputs
+    return {
+        "turns_per_s": round(steady_rate(spans, "model.response") / 2, 2),
+        "tool_calls_per_s": steady_rate(spans, "model.response", "subprocess"),
+        **p95_metrics(steady_spans(spans, "model.response"), p95_model_response_ms="model.response",
+                      p95_subprocess_ms="subprocess"),
+    }
+
+RUNNERS = {
+    "local-tools": bench_local_tools,
+    "file-search-upload": bench_upload,
+    "file-search-chat": bench_chat,
+    "local-shell": bench_local_shell,
+}
+
+# --- baselines ---
+
+def compare(results, baseline, tolerance):
+    """Returns [(scenario, metric, baseline, current)] for metrics worse than the tolerance allows.
+
+    `*_per_s` metrics must not drop, `*_ms` metrics must not grow, by more than `tolerance`
+    (and, for latencies, by more than MIN_DELTA_MS). A p95 over fewer than
+    MIN_GATED_SAMPLES spans, and the metrics in UNGATED, are not compared.
+    """
+    regressions = []
+    for scenario, metrics in results.items():
+        for metric, value in metrics.items():
+            before = baseline.get(scenario, {}).get(metric)
+            if before is None or value is None or not gated(metrics, metric):
+                continue
+            if metric.endswith("_per_s") and value < before * (1 - tolerance):
+                regressions.append((scenario, metric, before, value))
+            elif metric.endswith("_ms") and value > before * (1 + tolerance) and value - before > MIN_DELTA_MS:
+                regressions.append((scenario, metric, before, value))
+    return regressions
+
+def gated(metrics, metric):
+    return (metric != "samples" and metric not in UNGATED
+            and metrics.get("samples", {}).get(metric, MIN_GATED_SAMPLES) >= MIN_GATED_SAMPLES)
+
+def print_results(results, baseline):
+    print(f"\n{Colors.BOLD}{'scenario':<20} {'metric':<24} {'value':>10} {'baseline':>10} {'change':>8}{Colors.ENDC}")
+    for scenario, metrics in results.items():
+        for metric, value in metrics.items():
+            if metric == "samples":
+                continue
+            before = baseline.get(scenario, {}).get(metric)
+            change = f"{(value - before) / before:+.0%}" if before and value is not None else ""
+            note = "" if gated(metrics, metric) else \
+                "  (not gated)" if metric in UNGATED else f"  (n={metrics['samples'][metric]}, not gated)"
+            print(f"{scenario:<20} {metric:<24} {value if value is not None else '-':>10} "
+                  f"{before if before is not None else '-':>10} {change:>8}{note}")
+
+def main(args):
+    settings = {"latency": args.latency, "token_seconds": args.token_seconds, "ingest_seconds": args.ingest_seconds,
+                "prompts": args.prompts, "files": args.files, "turns": args.turns}
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            saved = json.load(f)
+        baseline = saved.get("scenarios", {})
+        if saved.get("settings") != settings:
+            print(f"{Colors.YELLOW}Baseline was recorded with {saved.get('settings')}; "
+                  f"comparing anyway.{Colors.ENDC}")
+
+    servers = serve.start(latency=args.latency, token_seconds=args.token_seconds,
+                          ingest_seconds=args.ingest_seconds)
+    env = {**os.environ, **serve.environment(servers)}
+    # Tracing is switched on per run with --trace; don't let an outer TRACE reach the scripts
+    env.pop("TRACE", None)
+    scenarios = args.scenarios or SCENARIOS
+    if "file-search-chat" in scenarios and "file-search-upload" not in scenarios:
+        scenarios = ["file-search-upload", *scenarios]
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory(prefix="offline-bench-") as work:
+            for name in SCENARIOS:
+                if name not in scenarios:
+                    continue
+                print(f"{Colors.BLUE}Running {name}...{Colors.ENDC}", flush=True)
+                start_time = time.perf_counter()
+                scenario_dir = os.path.join(work, name)
+                os.makedirs(scenario_dir)
+                results[name] = RUNNERS[name](env, scenario_dir, args, servers)
+                print(f"  done in {time.perf_counter() - start_time:.1f}s")
+    finally:
+        serve.shutdown(servers)
+
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"settings": settings, "scenarios": results}, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"settings": settings, "recorded_at": time.strftime("%Y-%m-%d"), "scenarios": results}, f, indent=2)
+            f.write("\n")
+        print(f"\n{Colors.GREEN}Baseline saved to {args.baseline}{Colors.ENDC}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for scenario, metric, before, value in regressions:
+        print(f"{Colors.RED}Regression: {scenario} {metric} {before} -> {value}{Colors.ENDC}")
+    if baseline and not regressions:
+        print(f"\n{Colors.GREEN}No regressions beyond {args.tolerance:.0%} of the baseline.{Colors.ENDC}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="End-to-end throughput/latency benchmark against fake backends")
+    ap.add_argument("scenarios", nargs="*", metavar="SCENARIO",
+                    help=f"Scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    ap.add_argument("--latency", type=float, default=serve.DEFAULT_LATENCY, help="Seconds added to every fake request")
+    ap.add_argument("--token-seconds", type=float, default=0.005, help="Delay between streamed tokens")
+    ap.add_argument("--ingest-seconds", type=float, default=0.3, help="Vector store processing time per file")
+    ap.add_argument("--prompts", type=int, default=40, help="Batch prompts for local-tools")
+    ap.add_argument("--files", type=int, default=50, help="Files uploaded by file-search-upload")
+    ap.add_argument("--turns", type=int, default=12, help="Turns for file-search-chat and local-shell")
+    ap.add_argument("--baseline", default=BASELINE_PATH, help="Baseline file to compare with (or save to)")
+    ap.add_argument("--save-baseline", action="store_true", help="Record this run as the new baseline")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression per metric")
+    ap.add_argument("--output", help="Also write this run's results to a JSON file")
+    args = ap.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        ap.error(f"unknown scenario(s): {', '.join(sorted(unknown))} (choose from {', '.join(SCENARIOS)})")
+    sys.exit(main(args))
@@ -0,0 +1,120 @@
+"""
+Docker Engine API stand-in with a fixed set of running containers.
+
+Covers what the local-tools server uses through the docker SDK: version/ping,
+container and image listings (with the `id` filter), container inspect, logs
+(multiplexed frames honouring `since`, `tail`, `timestamps` and `follow`) and the
+`/events` stream, which stays open and quiet. Every container has `log_lines`
+synthetic access-log lines, one second apart and ending when the server started.
+"""
+
+import json
+import re
+import time
+from datetime import datetime, timezone
+from fake_http import FakeHandler, serve as serve_handler
+
+API_VERSION = "1.44"
+IMAGE_ID = "sha256:" + "ab" * 32
+FOLLOW_HOLD_SECONDS = 60
+
+def make_containers(count):
+    containers = {}
+    for i in range(1, count + 1):
+        container_id = f"{i:064x}"
+        containers[container_id] = {
+            "Id": container_id, "Names": [f"/web-{i}"], "Image": "nginx:latest", "ImageID": IMAGE_ID,
+            "Command": "nginx -g 'daemon off;'", "Created": int(time.time()) - 3600, "State": "running",
+            "Status": "Up About an hour", "Labels": {},
+            "Ports": [{"IP": "0.0.0.0", "PrivatePort": 80, "PublicPort": 8000 + i, "Type": "tcp"}],
+        }
+    return containers
+
+def make_logs(count, end_ns):
+    return [(end_ns - (count - n) * 1_000_000_000, f'172.17.0.1 - - "GET /item/{n} HTTP/1.1" 200 612'.encode())
+            for n in range(count)]
+
+def rfc3339(ts_ns):
+    seconds, nanos = divmod(ts_ns, 1_000_000_000)
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S") + f".{nanos:09d}Z"
+
+def flag(query, name):
+    return query.get(name, ["0"])[0].lower() in ("1", "true")
+
+class DockerHandler(FakeHandler):
+    def route_key(self, path):
+        return re.sub(r"/containers/[^/]+/", "/containers/{id}/", path)
+
+    def find(self, name_or_id):
+        containers = self.server.containers
+        return containers.get(name_or_id) or next(
+            (c for c in containers.values() if c["Id"].startswith(name_or_id) or c["Names"][0] == "/" + name_or_id),
+            None)
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        path, query, _ = self.parse("GET")
+        path = re.sub(r"^/v[\d.]+", "", path)
+        if path == "/_ping":
+            body = b"OK"
+            self.send_response(200)
+            self.send_header("Api-Version", API_VERSION)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            return self.wfile.write(body)
+        if path == "/version":
+            return self.send_json({"ApiVersion": API_VERSION, "MinAPIVersion": "1.24", "Version": "fake",
+                                   "Os": "linux", "Arch": "amd64"})
+        if path == "/_hits":
+            return self.send_json(self.server.hits)
+        if path == "/images/json":
+            return self.send_json([{"Id": IMAGE_ID, "RepoTags": ["nginx:latest"], "Created": 0, "Size": 0}])
+        if path == "/containers/json":
+            filters = json.loads(query["filters"][0]) if "filters" in query else {}
+            containers = list(self.server.containers.values())
+            if "id" in filters:
+                ids = filters["id"] if isinstance(filters["id"], list) else list(filters["id"])
+                containers = [c for c in containers if any(c["Id"].startswith(i) for i in ids)]
+            return self.send_json(containers)
+        match = re.fullmatch(r"/containers/([^/]+)/(json|logs)", path)
+        if match:
+            container = self.find(match.group(1))
+            if container is None:
+                return self.send_json({"message": f"No such container: {match.group(1)}"}, 404)
+            if match.group(2) == "json":
+                return self.send_json({"Id": container["Id"], "Name": container["Names"][0], "Image": IMAGE_ID,
+                                       "Config": {"Tty": False, "Image": container["Image"], "Labels": {}},
+                                       "State": {"Status": "running", "Running": True}})
+            return self.send_logs(container, query)
+        if path == "/events":
+            self.start_chunked("application/json")
+            # Nothing ever changes; hold the stream open like the daemon does
+            while True:
+                time.sleep(3600)
+        self.send_json({"message": f"page not found: {path}"}, 404)
+
+    def send_logs(self, container, query):
+        since_ns = int(float(query.get("since", ["0"])[0]) * 1_000_000_000)
+        entries = [entry for entry in self.server.logs if entry[0] >= since_ns]
+        tail = query.get("tail", ["all"])[0]
+        if tail != "all":
+            entries = entries[len(entries) - int(tail):] if int(tail) > 0 else []
+        timestamps = flag(query, "timestamps")
+        self.start_chunked("application/vnd.docker.raw-stream")
+        try:
+            for ts_ns, line in entries:
+                payload = (rfc3339(ts_ns).encode() + b" " if timestamps else b"") + line + b"\n"
+                # stdout frame: stream type, 3 padding bytes, big-endian payload length
+                self.chunk(b"\x01\x00\x00\x00" + len(payload).to_bytes(4, "big") + payload)
+            if flag(query, "follow"):
+                # No new lines ever arrive; the client gives up after its follow window
+                time.sleep(FOLLOW_HOLD_SECONDS)
+            self.end_chunked()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+def serve(host="127.0.0.1", port=0, latency=0.0, containers=20, log_lines=200):
+    return serve_handler(DockerHandler, host, port, latency, containers=make_containers(containers),
+                         logs=make_logs(log_lines, time.time_ns()))
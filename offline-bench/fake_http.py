@@ -0,0 +1,81 @@
+"""
+Small HTTP plumbing shared by the fake backends.
+
+Each fake is a `ThreadingHTTPServer` with a `FakeHandler` subclass. Every request
+first sleeps for the server's `latency` (seconds), so the same scenario can be run
+against a "fast LAN" or a "slow cloud" backend. Streaming endpoints write HTTP/1.1
+chunks; `chunk()` flushes each one so clients see them as they are produced.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+class FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, handler, latency=0.0, **options):
+        super().__init__(address, handler)
+        self.latency = latency
+        # Backend-specific knobs (e.g. token pacing), read by the handler as attributes
+        for name, value in options.items():
+            setattr(self, name, value)
+        self.hits = {}
+        self.hits_lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def parse(self, method, prefix=""):
+        """Counts the hit, applies the latency and returns (path, query, raw body)."""
+        url = urlparse(self.path)
+        path = url.path.removeprefix(prefix) if prefix else url.path
+        with self.server.hits_lock:
+            key = f"{method} {self.route_key(path)}"
+            self.server.hits[key] = self.server.hits.get(key, 0) + 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        length = int(self.headers.get("Content-Length") or 0)
+        return path, parse_qs(url.query), self.rfile.read(length) if length else b""
+
+    def route_key(self, path):
+        """Groups paths for the hit counters (subclasses strip ids)."""
+        return path
+
+    def send_json(self, obj, status=200):
+        body = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def start_chunked(self, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def end_chunked(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+def serve(handler, host="127.0.0.1", port=0, latency=0.0, **options):
+    """Starts a fake server on a background thread and returns it (port 0 picks a free one)."""
+    server = FakeServer((host, port), handler, latency, **options)
+    threading.Thread(target=server.serve_forever, name=handler.__name__, daemon=True).start()
+    return server
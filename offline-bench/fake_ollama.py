@@ -0,0 +1,112 @@
+"""
+Ollama-compatible stand-in for `/api/chat` with a scripted "model".
+
+When the request offers tools and the last message comes from the user, the model
+answers with tool calls picked from the prompt: one `check_website_status` per URL,
+`get_container_logs` for "logs of <name>" and `list_docker_containers` for any other
+mention of containers. Otherwise it streams a short answer built from the last tool
+results. The latency is paid before the first chunk (prompt evaluation) and
+`token_seconds` between streamed tokens (generation).
+"""
+
+import json
+import re
+import time
+from datetime import datetime, timezone
+from fake_http import FakeHandler, serve as serve_handler
+
+MODEL = "llama3.2"
+ANSWER_WORDS = 24
+
+URL_RE = re.compile(r"https?://[^\s,;)\"']+")
+LOGS_RE = re.compile(r"\blogs?\s+(?:of|for|from)\s+([\w.-]+)", re.IGNORECASE)
+
+def plan_tool_calls(prompt, tool_names):
+    """Tool calls the scripted model makes for a user prompt."""
+    calls = []
+    if "check_website_status" in tool_names:
+        calls += [("check_website_status", {"url": url}) for url in URL_RE.findall(prompt)]
+    logs = LOGS_RE.search(prompt)
+    if logs and "get_container_logs" in tool_names:
+        calls.append(("get_container_logs", {"container_name_or_id": logs.group(1)}))
+    elif re.search(r"\bcontainers?\b", prompt, re.IGNORECASE) and "list_docker_containers" in tool_names:
+        calls.append(("list_docker_containers", {}))
+    return [{"function": {"name": name, "arguments": arguments}} for name, arguments in calls]
+
+def compose_answer(messages):
+    tool_results = []
+    for message in reversed(messages):
+        if message.get("role") != "tool":
+            break
+        tool_results.append(str(message.get("content", "")).strip().splitlines()[:1])
+    if tool_results:
+        summary = "; ".join(line[0] for line in reversed(tool_results) if line)
+        text = f"The tools report: {summary}"
+    else:
+        prompt = next((str(m.get("content", "")) for m in reversed(messages) if m.get("role") == "user"), "")
+        text = f"You asked: {prompt}"
+    return text.split()[:ANSWER_WORDS] or ["Done."]
+
+def prompt_tokens(messages):
+    # Roughly what a real tokenizer would count, enough for budget/compaction reports
+    return sum(len(json.dumps(m.get("content", ""))) for m in messages) // 4
+
+class OllamaHandler(FakeHandler):
+    def do_GET(self):
+        path, _, _ = self.parse("GET")
+        if path == "/api/version":
+            return self.send_json({"version": "0.0.0-fake"})
+        if path == "/api/tags":
+            return self.send_json({"models": [{"name": f"{MODEL}:latest", "model": f"{MODEL}:latest", "size": 0}]})
+        if path == "/_hits":
+            return self.send_json(self.server.hits)
+        if path == "/":
+            body = b"Ollama is running"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            return self.wfile.write(body)
+        self.send_json({"error": f"no route GET {path}"}, 404)
+
+    def do_POST(self):
+        path, _, raw = self.parse("POST")
+        if path != "/api/chat":
+            return self.send_json({"error": f"no route POST {path}"}, 404)
+        body = json.loads(raw or b"{}")
+        messages = body.get("messages") or []
+        tool_names = {tool.get("function", {}).get("name") for tool in body.get("tools") or []}
+        last = messages[-1] if messages else {}
+        tool_calls = plan_tool_calls(str(last.get("content", "")), tool_names) \
+            if tool_names and last.get("role") == "user" else []
+        words = [] if tool_calls else compose_answer(messages)
+        started = time.perf_counter()
+
+        def chunk(message, done=False, **extra):
+            return {"model": body.get("model", MODEL), "created_at": datetime.now(timezone.utc).isoformat(),
+                    "message": {"role": "assistant", "content": "", **message}, "done": done, **extra}
+
+        def final():
+            elapsed = int((time.perf_counter() - started) * 1e9)
+            return chunk({}, done=True, done_reason="stop", total_duration=elapsed, eval_duration=elapsed,
+                         eval_count=max(len(words), len(tool_calls)), prompt_eval_count=prompt_tokens(messages))
+
+        if not body.get("stream", True):
+            time.sleep(self.server.token_seconds * len(words))
+            response = final()
+            response["message"] = {"role": "assistant", "content": " ".join(words),
+                                   **({"tool_calls": tool_calls} if tool_calls else {})}
+            return self.send_json(response)
+
+        self.start_chunked("application/x-ndjson")
+        send = lambda obj: self.chunk((json.dumps(obj) + "\n").encode())
+        if tool_calls:
+            send(chunk({"tool_calls": tool_calls}))
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.server.token_seconds)
+            send(chunk({"content": word if i == 0 else " " + word}))
+        send(final())
+        self.end_chunked()
+
+def serve(host="127.0.0.1", port=0, latency=0.0, token_seconds=0.0):
+    return serve_handler(OllamaHandler, host, port, latency, token_seconds=token_seconds)
@@ -0,0 +1,297 @@
+"""
+OpenAI stand-in for the Files, Vector Stores, Embeddings and Responses endpoints.
+
+State lives in memory for the life of the process. Attached files stay `in_progress`
+for `ingest_seconds` and then complete, so upload scripts really poll. Responses are
+scripted: with the `local_shell` tool the model asks to run `shell_commands` until it
+is sent their outputs, and then (like any other request) it answers with a short
+text, streamed as server-sent events when `stream` is set, citing a file of the
+store named by the `file_search` tool. Like a reasoning model, `local_shell` output
+starts with a `reasoning` item, and output items sent back as input are rejected
+without it. `reject_chained` makes that many `previous_response_id` requests fail, to
+exercise the clients' full-resend fallback. Embeddings are deterministic hashed
+bag-of-words vectors, so dense retrieval gives stable results.
+"""
+
+import hashlib
+import itertools
+import json
+import re
+import threading
+import time
+from fake_http import FakeHandler, serve as serve_handler
+
+EMBEDDING_DIMENSIONS = 64
+DEFAULT_SHELL_COMMANDS = [["ls"], ["echo", "done"]]
+
+class State:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.files = {}
+        self.stores = {}
+        self.store_files = {}  # vector store id -> {file id: attached at}
+        self.batches = {}
+        self.requests = []  # one summary per /responses call (payload size, chaining)
+        self.reasoning_for = {}  # output item id -> id of the reasoning item it came with
+
+    def new_id(self, prefix):
+        with self.lock:
+            return f"{prefix}-{next(self.ids):08d}"
+
+def page(items, query):
+    limit = int(query.get("limit", ["20"])[0])
+    after = query.get("after", [None])[0]
+    if after:
+        ids = [item["id"] for item in items]
+        items = items[ids.index(after) + 1:] if after in ids else []
+    data = items[:limit]
+    return {"object": "list", "data": data, "first_id": data[0]["id"] if data else None,
+            "last_id": data[-1]["id"] if data else None, "has_more": len(items) > limit}
+
+def embed(text):
+    vector = [0.0] * EMBEDDING_DIMENSIONS
+    for word in re.findall(r"\w+", text.lower()):
+        vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % EMBEDDING_DIMENSIONS] += 1.0
+    return vector
+
+def text_of(item):
+    content = item.get("content", item.get("output", ""))
+    if isinstance(content, str):
+        return content
+    return " ".join(part.get("text", "") for part in content or [] if isinstance(part, dict))
+
+class OpenAIHandler(FakeHandler):
+    def route_key(self, path):
+        return re.sub(r"/[a-z]+-\d+", "/{id}", path)
+
+    def do_GET(self):
+        self.route("GET")
+
+    def do_POST(self):
+        self.route("POST")
+
+    def do_DELETE(self):
+        self.route("DELETE")
+
+    # --- vector store helpers ---
+
+    def store_file(self, store_id, file_id):
+        state = self.server.state
+        attached = state.store_files[store_id][file_id]
+        done = time.time() - attached >= self.server.ingest_seconds
+        return {"id": file_id, "object": "vector_store.file", "created_at": int(attached),
+                "usage_bytes": state.files.get(file_id, {}).get("bytes", 0), "vector_store_id": store_id,
+                "status": "completed" if done else "in_progress", "last_error": None, "attributes": {}}
+
+    def file_counts(self, store_id, only=None):
+        counts = {"in_progress": 0, "completed": 0, "failed": 0, "cancelled": 0, "total": 0}
+        for file_id in list(self.server.state.store_files[store_id]):
+            if only is None or file_id in only:
+                counts[self.store_file(store_id, file_id)["status"]] += 1
+                counts["total"] += 1
+        return counts
+
+    def store(self, store_id):
+        store = self.server.state.stores[store_id]
+        return {**store, "file_counts": self.file_counts(store_id), "usage_bytes": 0, "status": "completed",
+                "last_active_at": store["created_at"], "metadata": {}, "expires_after": None, "expires_at": None}
+
+    def batch(self, batch_id):
+        batch = self.server.state.batches[batch_id]
+        counts = self.file_counts(batch["vector_store_id"], set(batch["file_ids"]))
+        return {"id": batch_id, "object": "vector_store.files_batch", "created_at": batch["created_at"],
+                "vector_store_id": batch["vector_store_id"], "file_counts": counts,
+                "status": "in_progress" if counts["in_progress"] else "completed"}
+
+    def not_found(self, what):
+        self.send_json({"error": {"message": f"No {what} found", "type": "invalid_request_error"}}, 404)
+
+    # --- routing ---
+
+    def route(self, method):
+        path, query, raw = self.parse(method, prefix="/v1")
+        state = self.server.state
+        body = json.loads(raw) if raw and self.headers.get("Content-Type", "").startswith("application/json") else {}
+
+        if path == "/_hits":
+            return self.send_json(self.server.hits)
+        if path == "/_requests":
+            return self.send_json(state.requests)
+
+        if path == "/files" and method == "POST":
+            match = re.search(rb'filename="([^"]*)"', raw)
+            file_id = state.new_id("file")
+            state.files[file_id] = {"id": file_id, "object": "file", "bytes": len(raw), "created_at": int(time.time()),
+                                    "filename": match.group(1).decode() if match else "upload", "purpose": "assistants",
+                                    "status": "processed"}
+            return self.send_json(state.files[file_id])
+        if path == "/files":
+            return self.send_json(page(list(state.files.values()), query))
+        match = re.fullmatch(r"/files/([^/]+)", path)
+        if match:
+            file_id = match.group(1)
+            if file_id not in state.files:
+                return self.not_found("file")
+            if method == "DELETE":
+                state.files.pop(file_id)
+                return self.send_json({"id": file_id, "object": "file", "deleted": True})
+            return self.send_json(state.files[file_id])
+
+        if path == "/vector_stores":
+            if method == "POST":
+                store_id = state.new_id("vs")
+                state.stores[store_id] = {"id": store_id, "object": "vector_store", "created_at": int(time.time()),
+                                          "name": body.get("name")}
+                state.store_files[store_id] = {}
+                return self.send_json(self.store(store_id))
+            return self.send_json(page([self.store(store_id) for store_id in reversed(list(state.stores))], query))
+        match = re.fullmatch(r"/vector_stores/([^/]+)(/.*)?", path)
+        if match:
+            store_id, rest = match.group(1), match.group(2) or ""
+            if store_id not in state.stores:
+                return self.not_found("vector store")
+            return self.route_store(method, store_id, rest, query, body)
+
+        if path == "/embeddings" and method == "POST":
+            texts = [body["input"]] if isinstance(body["input"], str) else body["input"]
+            return self.send_json({"object": "list", "model": body.get("model"),
+                                   "data": [{"object": "embedding", "index": i, "embedding": embed(text)}
+                                            for i, text in enumerate(texts)],
+                                   "usage": {"prompt_tokens": 0, "total_tokens": 0}})
+        if path == "/responses" and method == "POST":
+            return self.respond(body)
+        self.send_json({"error": {"message": f"No route {method} {path}"}}, 404)
+
+    def route_store(self, method, store_id, rest, query, body):
+        state = self.server.state
+        files = state.store_files[store_id]
+        if rest == "":
+            return self.send_json(self.store(store_id))
+        if rest == "/files":
+            if method == "POST":
+                files[body["file_id"]] = time.time()
+                return self.send_json(self.store_file(store_id, body["file_id"]))
+            items = [self.store_file(store_id, file_id) for file_id in list(files)]
+            if "filter" in query:
+                items = [item for item in items if item["status"] == query["filter"][0]]
+            return self.send_json(page(items, query))
+        match = re.fullmatch(r"/files/([^/]+)", rest)
+        if match:
+            file_id = match.group(1)
+            if file_id not in files:
+                return self.not_found("vector store file")
+            if method == "DELETE":
+                files.pop(file_id)
+                return self.send_json({"id": file_id, "object": "vector_store.file.deleted", "deleted": True})
+            return self.send_json(self.store_file(store_id, file_id))
+        if rest == "/file_batches" and method == "POST":
+            batch_id = state.new_id("vsfb")
+            now = time.time()
+            for file_id in body["file_ids"]:
+                files[file_id] = now
+            state.batches[batch_id] = {"vector_store_id": store_id, "file_ids": body["file_ids"], "created_at": int(now)}
+            return self.send_json(self.batch(batch_id))
+        match = re.fullmatch(r"/file_batches/([^/]+)", rest)
+        if match and match.group(1) in state.batches:
+            return self.send_json(self.batch(match.group(1)))
+        if rest == "/search" and method == "POST":
+            query_text = body["query"] if isinstance(body["query"], str) else " ".join(body["query"])
+            hits = [{"file_id": file_id, "filename": state.files.get(file_id, {}).get("filename", file_id),
+                     "score": 0.5, "attributes": {}, "content": [{"type": "text", "text": f"Passage about {query_text}"}]}
+                    for file_id in list(files)[:body.get("max_num_results", 10)]]
+            return self.send_json({"object": "vector_store.search_results.page", "search_query": [query_text],
+                                   "data": hits, "has_more": False, "next_page": None})
+        self.send_json({"error": {"message": f"No route {method} /vector_stores/{store_id}{rest}"}}, 404)
+
+    # --- responses ---
+
+    def invalid(self, message, param=None):
+        self.send_json({"error": {"message": message, "type": "invalid_request_error", "param": param,
+                                  "code": None}}, 400)
+
+    def respond(self, body):
+        state = self.server.state
+        items = body.get("input")
+        items = [{"role": "user", "content": items}] if isinstance(items, str) else items or []
+        state.requests.append({"bytes": len(json.dumps(body)), "items": len(items),
+                               "previous_response_id": body.get("previous_response_id")})
+        if body.get("previous_response_id") and self.server.reject_chained > 0:
+            self.server.reject_chained -= 1
+            return self.invalid(f"Previous response with id '{body['previous_response_id']}' not found.",
+                                "previous_response_id")
+        seen = set()
+        for item in items:
+            required = state.reasoning_for.get(item.get("id"))
+            if required and required not in seen:
+                return self.invalid(f"Item '{item['id']}' of type '{item.get('type')}' was provided without "
+                                    f"its required 'reasoning' item: '{required}'.", "input")
+            if item.get("type") == "reasoning":
+                seen.add(item.get("id"))
+        tools = body.get("tools") or []
+        last = items[-1] if items else {}
+        response = {"id": state.new_id("resp"), "object": "response", "created_at": int(time.time()),
+                    "model": body.get("model"), "status": "completed", "parallel_tool_calls": True,
+                    "tool_choice": "auto", "tools": [], "previous_response_id": body.get("previous_response_id")}
+
+        wants_shell = any(tool.get("type") == "local_shell" for tool in tools)
+        reasoning = []
+        if wants_shell:
+            reasoning = [{"type": "reasoning", "id": state.new_id("rs"), "summary": []}]
+            if "reasoning.encrypted_content" in (body.get("include") or []):
+                reasoning[0]["encrypted_content"] = "gAAAA-offline-bench"
+        if wants_shell and last.get("type") != "local_shell_call_output":
+            response["output"] = reasoning + [
+                {"type": "local_shell_call", "id": state.new_id("lsh"), "call_id": state.new_id("call"),
+                 "status": "completed",
+                 "action": {"type": "exec", "command": command, "env": {}, "timeout_ms": None, "user": None,
+                            "working_directory": None}}
+                for command in self.server.shell_commands]
+            state.reasoning_for.update((item["id"], reasoning[0]["id"]) for item in response["output"][1:])
+            return self.send_json(response)
+
+        if last.get("type") == "local_shell_call_output":
+            text = f"Ran {sum(item.get('type') == 'local_shell_call_output' for item in items)} command(s)."
+        else:
+            text = f"Answer to: {text_of(last)[:200]}"
+        annotations = []
+        store_ids = [store_id for tool in tools if tool.get("type") == "file_search"
+                     for store_id in tool.get("vector_store_ids", [])]
+        cited = next((file_id for store_id in store_ids for file_id in state.store_files.get(store_id, {})), None)
+        if cited:
+            annotations.append({"type": "file_citation", "file_id": cited, "index": len(text),
+                                "filename": state.files.get(cited, {}).get("filename", cited)})
+        message = {"id": state.new_id("msg"), "type": "message", "role": "assistant", "status": "completed",
+                   "content": [{"type": "output_text", "text": text, "annotations": annotations, "logprobs": []}]}
+        response["output"] = reasoning + [message]
+        if reasoning:
+            state.reasoning_for[message["id"]] = reasoning[0]["id"]
+        output_index = len(reasoning)
+        if not body.get("stream"):
+            return self.send_json(response)
+
+        self.start_chunked("text/event-stream")
+        sequence = itertools.count()
+
+        def event(payload):
+            payload["sequence_number"] = next(sequence)
+            self.chunk(f"event: {payload['type']}\ndata: {json.dumps(payload)}\n\n".encode())
+
+        event({"type": "response.created", "response": {**response, "status": "in_progress", "output": []}})
+        for i, word in enumerate(text.split(" ")):
+            if i:
+                time.sleep(self.server.token_seconds)
+            event({"type": "response.output_text.delta", "item_id": message["id"], "output_index": output_index,
+                   "content_index": 0, "delta": word if i == 0 else " " + word, "logprobs": []})
+        for i, annotation in enumerate(annotations):
+            event({"type": "response.output_text.annotation.added", "item_id": message["id"],
+                   "output_index": output_index, "content_index": 0, "annotation_index": i,
+                   "annotation": annotation})
+        event({"type": "response.completed", "response": response})
+        self.end_chunked()
+
+def serve(host="127.0.0.1", port=0, latency=0.0, token_seconds=0.0, ingest_seconds=0.3, shell_commands=None,
+          reject_chained=0):
+    return serve_handler(OpenAIHandler, host, port, latency, token_seconds=token_seconds,
+                         ingest_seconds=ingest_seconds, shell_commands=shell_commands or DEFAULT_SHELL_COMMANDS,
+                         reject_chained=reject_chained, state=State())
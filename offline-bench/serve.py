@@ -0,0 +1,70 @@
+"""
+Starts the fake Ollama, OpenAI and Docker backends and prints the environment that
+points the existing entry points at them:
+
+    python offline-bench/serve.py --latency 0.05
+    # in another shell, paste the printed exports, then e.g.
+    python local-tools/client.py
+"""
+
+import argparse
+import os
+import sys
+import time
+import fake_docker
+import fake_ollama
+import fake_openai
+
+# Per-request latency of each backend unless overridden (seconds)
+DEFAULT_LATENCY = float(os.getenv("FAKE_LATENCY", "0.05"))
+
+def start(host="127.0.0.1", latency=DEFAULT_LATENCY, ollama_latency=None, openai_latency=None, docker_latency=None,
+          token_seconds=0.005, ingest_seconds=0.3, shell_commands=None, ports=(0, 0, 0)):
+    """Starts the three fakes; returns {"ollama": server, "openai": server, "docker": server}."""
+    pick = lambda value: latency if value is None else value
+    return {
+        "ollama": fake_ollama.serve(host, ports[0], pick(ollama_latency), token_seconds=token_seconds),
+        "openai": fake_openai.serve(host, ports[1], pick(openai_latency), token_seconds=token_seconds,
+                                    ingest_seconds=ingest_seconds, shell_commands=shell_commands),
+        "docker": fake_docker.serve(host, ports[2], pick(docker_latency)),
+    }
+
+def environment(servers):
+    """Environment variables that send the SDKs used by the sub-projects to the fakes."""
+    host, port = servers["docker"].server_address[:2]
+    return {
+        "OLLAMA_HOST": servers["ollama"].url,
+        "OPENAI_BASE_URL": servers["openai"].url + "/v1",
+        "OPENAI_API_KEY": "sk-offline-bench",
+        "DOCKER_HOST": f"tcp://{host}:{port}",
+    }
+
+def shutdown(servers):
+    for server in servers.values():
+        server.shutdown()
+        server.server_close()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Run fake Ollama, OpenAI and Docker backends")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--latency", type=float, default=DEFAULT_LATENCY, help="Seconds added to every request")
+    ap.add_argument("--ollama-latency", type=float, help="Override --latency for Ollama")
+    ap.add_argument("--openai-latency", type=float, help="Override --latency for OpenAI")
+    ap.add_argument("--docker-latency", type=float, help="Override --latency for Docker")
+    ap.add_argument("--token-seconds", type=float, default=0.005, help="Delay between streamed tokens")
+    ap.add_argument("--ingest-seconds", type=float, default=0.3,
+                    help="How long attached files stay in_progress in a vector store")
+    ap.add_argument("--ports", type=int, nargs=3, default=[11435, 18080, 12375], metavar=("OLLAMA", "OPENAI", "DOCKER"),
+                    help="Ports to listen on (0 picks free ones)")
+    args = ap.parse_args()
+
+    servers = start(args.host, args.latency, args.ollama_latency, args.openai_latency, args.docker_latency,
+                    args.token_seconds, args.ingest_seconds, ports=args.ports)
+    for name, value in environment(servers).items():
+        print(f"export {name}={value}")
+    print("# Ctrl-C to stop", file=sys.stderr, flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        shutdown(servers)
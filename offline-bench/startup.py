@@ -0,0 +1,146 @@
+"""
+Start-up benchmark of every entry point.
+
+For each script it measures, as the median of a few runs:
+
+- `help_ms`: wall time of `--help` (interpreter start, imports, argument parsing);
+- `first_request_ms`: from launching the process to the end of its first API request
+  against the fake backends (with no added latency, so only client-side cost shows),
+  read from the script's `--trace`.
+
+`--compare REV` also measures a git revision of the repo (extracted to a temporary
+directory), alternating runs between the two trees, and prints both side by side.
+"""
+
+import argparse
+import io
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(HERE)
+sys.path.insert(0, REPO)
+from helpers import Colors
+from benchmark import read_trace
+import serve
+
+# script -> how to reach its first request: extra args, stdin, and the span that ends it
+ENTRY_POINTS = {
+    "local-tools/client.py": {"stdin": "Say hello\nquit\n", "span": "model.chat"},
+    "local-tools/server.py": None,
+    "openai-file-search/00_upload_file.py": {"args": ["--file", "{doc}", "--store", "startup"], "span": "upload"},
+    "openai-file-search/01_check_files.py": {"span": "vector_store.retrieve"},
+    "openai-file-search/10_file_search_client.py": {"stdin": "What is this about?\nquit\n", "span": "model.response"},
+    "openai-file-search/20_benchmark_retrieval.py": None,
+    "openai-local-shell/00_local_shell_client.py": {"stdin": "List the files\nn\nquit\n", "span": "model.response"},
+}
+
+def time_help(root, script, env):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, script, "--help"], cwd=root, env=env, capture_output=True, check=True)
+    return (time.perf_counter() - start) * 1000
+
+def time_first_request(root, script, spec, env, work):
+    """Ms from process launch to the end of the first `spec['span']`, or None if never reached."""
+    scratch = tempfile.mkdtemp(dir=work)
+    trace = os.path.join(scratch, "trace.jsonl")
+    env = {**env, "UPLOAD_MANIFEST": os.path.join(scratch, "manifest.sqlite"),
+           "ANSWER_CACHE": os.path.join(scratch, "answers.sqlite")}
+    args = [arg.format(doc=os.path.join(work, "doc.txt")) for arg in spec.get("args", [])]
+    start = time.time()
+    result = subprocess.run([sys.executable, script, *args, "--trace", trace], cwd=root, env=env,
+                            input=spec.get("stdin", ""), capture_output=True, text=True, timeout=120)
+    journal = re.search(r"Session journal: (\S+\.jsonl)", result.stdout)
+    if journal and os.path.exists(journal.group(1)):
+        os.remove(journal.group(1))
+    ends = [s["start"] + s["ms"] / 1000 for s in (read_trace(trace) if os.path.exists(trace) else [])
+            if s["name"] == spec["span"]]
+    return (min(ends) - start) * 1000 if ends else None
+
+def median(samples):
+    return None if not samples or None in samples else round(statistics.median(samples), 1)
+
+def measure(roots, env, runs):
+    """{label: {script: {help_ms, first_request_ms}}} for each {label: repo root}.
+
+    Runs alternate between the roots so that drift in machine load affects them alike.
+    """
+    results = {label: {} for label in roots}
+    with tempfile.TemporaryDirectory(prefix="startup-") as work:
+        with open(os.path.join(work, "doc.txt"), "w", encoding="utf-8") as f:
+            f.write("Start-up benchmark document.\n")
+        for script, spec in ENTRY_POINTS.items():
+            present = {label: root for label, root in roots.items() if os.path.exists(os.path.join(root, script))}
+            if not present:
+                continue
+            print(f"{Colors.BLUE}  {script}{Colors.ENDC}", file=sys.stderr, flush=True)
+            help_ms = {label: [] for label in present}
+            first_ms = {label: [] for label in present}
+            for _ in range(runs):
+                for label, root in present.items():
+                    help_ms[label].append(time_help(root, script, env))
+                    if spec:
+                        first_ms[label].append(time_first_request(root, script, spec, env, work))
+            for label in present:
+                results[label][script] = {"help_ms": median(help_ms[label]),
+                                          "first_request_ms": median(first_ms[label])}
+    return results
+
+def extract_revision(rev, target):
+    archive = subprocess.run(["git", "-C", REPO, "archive", rev], capture_output=True, check=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(target)
+
+def create_store(servers):
+    request = urllib.request.Request(servers["openai"].url + "/v1/vector_stores", data=b'{"name": "startup"}',
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)["id"]
+
+def print_results(current, previous=None, rev=None):
+    fmt = lambda value: "-" if value is None else f"{value:.0f}"
+    header = f"{'entry point':<44} {'help ms':>9} {'first req ms':>13}"
+    if previous is not None:
+        header += f" {rev + ' help':>14} {rev + ' first':>14}"
+    print(f"\n{Colors.BOLD}{header}{Colors.ENDC}")
+    for script, now in current.items():
+        row = f"{script:<44} {fmt(now['help_ms']):>9} {fmt(now['first_request_ms']):>13}"
+        if previous is not None:
+            before = previous.get(script, {})
+            row += f" {fmt(before.get('help_ms')):>14} {fmt(before.get('first_request_ms')):>14}"
+        print(row)
+
+def main(args):
+    servers = serve.start(latency=0.0, token_seconds=0.0, ingest_seconds=0.0)
+    env = {**os.environ, **serve.environment(servers)}
+    env.pop("TRACE", None)
+    env["OPENAI_VECTOR_STORE_ID"] = create_store(servers)
+    try:
+        with tempfile.TemporaryDirectory(prefix="startup-rev-") as old_root:
+            roots = {"current": REPO}
+            if args.compare:
+                extract_revision(args.compare, old_root)
+                roots[args.compare] = old_root
+            print(f"{Colors.BLUE}Measuring {', '.join(roots)}...{Colors.ENDC}", file=sys.stderr)
+            results = measure(roots, env, args.runs)
+    finally:
+        serve.shutdown(servers)
+    print_results(results["current"], results.get(args.compare), args.compare)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Measure --help and first-request time of every entry point")
+    ap.add_argument("--runs", type=int, default=5, help="Runs per measurement (the median is reported)")
+    ap.add_argument("--compare", metavar="REV", help="Also measure this git revision (e.g. HEAD~1) for comparison")
+    ap.add_argument("--output", help="Write the results to a JSON file")
+    main(ap.parse_args())
@@ -1,21 +1,31 @@
 
 import argparse
-import os, sys
-from openai import OpenAI
-from dotenv import load_dotenv
+import glob
+import os, sys, random, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 # Add parent directory to path
-sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from clients import openai, openai_client, warm_up
 from helpers import Colors
-# Load environment variables from .env file
-BASE = os.path.dirname(os.path.dirname(__file__)) if "__file__" in globals() else os.getcwd()
-load_dotenv(dotenv_path=os.path.join(BASE, '.env'), verbose=True)
-api_key = os.getenv("OPENAI_API_KEY")
-client=OpenAI(api_key=api_key)
+import instrumentation
+from instrumentation import span
+from manifest import Manifest
+from local_index import LocalIndex, openai_embedder
+
+def transient_errors():
+    """Errors worth retrying with backoff; anything else fails the file immediately."""
+    return (openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError, openai.RateLimitError)
+
+MAX_ATTEMPTS = 5
+FILE_BATCH_SIZE = 500  # the API accepts at most 500 file ids per file batch
+# Above this many pending files, poll status-filtered listings instead of one retrieve per file
+LIST_POLL_THRESHOLD = 50
 
 def create_file(client, file_path):
     """Uploads a file to the OpenAI API and returns the file ID."""
     try:
-        with open(file_path, "rb") as file_content:
+        with span("upload", file=os.path.basename(file_path), bytes=os.path.getsize(file_path)), \
+                open(file_path, "rb") as file_content:
             result =  client.files.create(
                 file=file_content,
                 purpose="assistants"
@@ -51,8 +61,8 @@ def add_file_to_vector_store(client, vector_store_id, file_id):
 def vector_store_exists(client, store_name):
     """Checks if a vector store with the given name exists."""
     try:
-        existing_stores = client.vector_stores.list()
-        for store in existing_stores.data:
+        # Iterating the page object follows the pagination cursor through every store
+        for store in client.vector_stores.list(limit=100):
             if store.name == store_name:
                 return True, store.id
         return False, None
@@ -60,13 +70,301 @@ def vector_store_exists(client, store_name):
         print(f"{Colors.RED}Error checking vector store existence: {e}{Colors.ENDC}")
         return False, None
 
-if __name__ == "__main__":
-    ap = argparse.ArgumentParser(description="Upload a file to OpenAI API")
-    ap.add_argument("--file", type=str, help="Path to the file to upload", required=True)
-    ap.add_argument("--store", type=str, help="Name of the vector store to create", required=True)
+def with_retries(fn, *args, attempts=MAX_ATTEMPTS, base_delay=1.0, **kwargs):
+    """Calls fn, retrying transient API errors with exponential backoff and jitter."""
+    for attempt in range(1, attempts + 1):
+        try:
+            return fn(*args, **kwargs)
+        except transient_errors() as e:
+            if attempt == attempts:
+                raise
+            delay = base_delay * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+            print(f"{Colors.YELLOW}Transient error ({e.__class__.__name__}), retry {attempt}/{attempts - 1} in {delay:.1f}s{Colors.ENDC}")
+            time.sleep(delay)
+
+def upload_file(client, file_path):
+    """Uploads one file and returns its ID; unlike create_file, errors are raised."""
+    with span("upload", file=os.path.basename(file_path), bytes=os.path.getsize(file_path)):
+        with open(file_path, "rb") as file_content:
+            return client.files.create(file=file_content, purpose="assistants").id
+
+def collect_files(directory=None, pattern=None):
+    """Returns the sorted list of regular files under a directory or matching a glob."""
+    if directory:
+        paths = [os.path.join(root, name) for root, _, names in os.walk(directory) for name in names]
+    else:
+        paths = glob.glob(pattern, recursive=True)
+    return sorted(p for p in paths if os.path.isfile(p))
+
+def upload_files(client, paths, workers):
+    """Uploads files concurrently on a bounded thread pool.
+
+    Returns ({path: file_id} for the successful uploads, [(path, error)] for the failed ones).
+    """
+    # Retries are handled by with_retries, so turn off the SDK's own retry loop
+    uploader = client.with_options(max_retries=0)
+    uploaded, failed = {}, []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(with_retries, upload_file, uploader, path): path for path in paths}
+        for done, future in enumerate(as_completed(futures), start=1):
+            path = futures[future]
+            try:
+                uploaded[path] = future.result()
+            except Exception as e:
+                failed.append((path, str(e)))
+                print(f"{Colors.RED}Error uploading {path}: {e}{Colors.ENDC}")
+            print(f"{Colors.BLUE}Uploaded {done}/{len(paths)}{Colors.ENDC}", end="\r")
+    print()
+    return uploaded, failed
+
+def add_files_to_vector_store(client, vector_store_id, file_ids, batch_size=FILE_BATCH_SIZE):
+    """Attaches files to a vector store with one file batch per `batch_size` ids.
+
+    Returns {file_id: error} for the files whose batch could not be created.
+    """
+    unattached = {}
+    for start in range(0, len(file_ids), batch_size):
+        chunk = file_ids[start:start + batch_size]
+        try:
+            with span("attach", files=len(chunk)):
+                with_retries(client.vector_stores.file_batches.create, vector_store_id, file_ids=chunk)
+        except Exception as e:
+            print(f"{Colors.RED}Error attaching {len(chunk)} files: {e}{Colors.ENDC}")
+            unattached.update(dict.fromkeys(chunk, str(e)))
+    return unattached
+
+def _settled_statuses(client, vector_store_id, pending):
+    """Returns {file_id: (status, last_error)} for the pending files that finished processing."""
+    settled = {}
+    if len(pending) <= LIST_POLL_THRESHOLD:
+        for file_id in pending:
+            try:
+                vs_file = with_retries(client.vector_stores.files.retrieve, file_id, vector_store_id=vector_store_id)
+            except Exception as e:
+                # Deleted meanwhile, or retries exhausted: this file failed, the others keep their status
+                settled[file_id] = ("failed", f"status lookup failed: {e}")
+                continue
+            if vs_file.status != "in_progress":
+                settled[file_id] = (vs_file.status, vs_file.last_error)
+        return settled
+
+    # Many files: page through the (shrinking) in-progress list, everything else has settled
+    in_progress = {f.id for f in client.vector_stores.files.list(
+        vector_store_id=vector_store_id, filter="in_progress", limit=100)}
+    done = pending - in_progress
+    if done:
+        for status in ("failed", "cancelled"):
+            for f in client.vector_stores.files.list(vector_store_id=vector_store_id, filter=status, limit=100):
+                if f.id in done:
+                    settled[f.id] = (status, f.last_error)
+        for file_id in done - settled.keys():
+            settled[file_id] = ("completed", None)
+    return settled
+
+def wait_for_ingestion(client, vector_store_id, file_ids, timeout=600, initial_delay=0.5, max_delay=10.0):
+    """Waits until the given files leave `in_progress`, polling with backoff and jitter.
+
+    Only the still-pending files are looked up. Returns a dict with the `completed`
+    ids, the `failed` ids mapped to their last error, and the ids still `pending`
+    when the overall `timeout` ran out.
+    """
+    pending = set(file_ids)
+    result = {"completed": [], "failed": {}, "pending": []}
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    while pending:
+        with span("poll", pending=len(pending)):
+            settled = _settled_statuses(client, vector_store_id, pending)
+        for file_id, (status, last_error) in settled.items():
+            if status == "completed":
+                result["completed"].append(file_id)
+            else:
+                result["failed"][file_id] = last_error or status
+        pending -= settled.keys()
+        print(f"{Colors.BLUE}Processing: {len(result['completed'])} completed, {len(result['failed'])} failed, "
+              f"{len(pending)} pending{Colors.ENDC}", end="\r")
+        if not pending or time.monotonic() >= deadline:
+            break
+        # Back off while nothing changes, poll sooner again once files start settling
+        delay = initial_delay if settled else min(delay * 2, max_delay)
+        time.sleep(min(delay * random.uniform(0.8, 1.2), max(deadline - time.monotonic(), 0)))
+    print()
+    result["pending"] = sorted(pending)
+    return result
+
+def report_ingestion(result):
+    """Prints the failures / leftovers of wait_for_ingestion and returns True if all completed."""
+    for file_id, error in result["failed"].items():
+        print(f"{Colors.RED}  File {file_id} failed: {error}{Colors.ENDC}")
+    if result["pending"]:
+        print(f"{Colors.RED}  Timed out with {len(result['pending'])} files still processing.{Colors.ENDC}")
+    return not result["failed"] and not result["pending"]
+
+def ensure_vector_store(client, store_name, manifest=None):
+    """Returns the ID of the named vector store, creating it if needed (None on failure).
+
+    A store id remembered in the manifest is verified with one retrieve call instead
+    of listing every store.
+    """
+    if manifest is not None and (vector_store_id := manifest.store_id(store_name)):
+        try:
+            client.vector_stores.retrieve(vector_store_id)
+            print(f"{Colors.GREEN}Vector store '{store_name}' already exists with ID: {vector_store_id}{Colors.ENDC}")
+            return vector_store_id
+        except openai.NotFoundError:
+            manifest.forget_store(store_name)
+
+    exists, vector_store_id = vector_store_exists(client, store_name)
+    if exists:
+        print(f"{Colors.GREEN}Vector store '{store_name}' already exists with ID: {vector_store_id}{Colors.ENDC}")
+    else:
+        vector_store_id = create_vector_store(client, store_name)
+        if vector_store_id:
+            print(f"{Colors.GREEN}Vector store '{store_name}' created with ID: {vector_store_id}{Colors.ENDC}")
+    if vector_store_id and manifest is not None:
+        manifest.set_store(store_name, vector_store_id)
+    return vector_store_id
+
+def detach_files(client, vector_store_id, file_ids, workers=8):
+    """Removes files from the vector store and deletes the uploaded OpenAI files."""
+    def detach(file_id):
+        for call, kwargs in ((client.vector_stores.files.delete, {"vector_store_id": vector_store_id}),
+                             (client.files.delete, {})):
+            try:
+                with_retries(call, file_id, **kwargs)
+            except openai.NotFoundError:
+                pass
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(detach, file_ids))
+
+def update_local_index(client, vector_store_id, manifest, dense=False):
+    """Mirrors the store's processed files (per the manifest) into the local retrieval index."""
+    files = {path: row["sha256"] for path, row in manifest.files(vector_store_id).items() if row["status"] == "completed"}
+    print(f"{Colors.YELLOW}Updating the local index...{Colors.ENDC}")
+    start_time = time.perf_counter()
+    index = LocalIndex.for_store(vector_store_id)
+    try:
+        with span("local_index.sync", files=len(files), dense=dense):
+            counts = index.sync(files, embed=openai_embedder(client) if dense else None)
+    except Exception as e:
+        print(f"{Colors.RED}Local index update failed: {e}{Colors.ENDC}")
+        return
+    finally:
+        index.close()
+    embedded = f", {counts['embedded']} chunks embedded" if "embedded" in counts else \
+        ", dense vectors dropped (stale; sync with --dense to rebuild)" if counts.get("vectors_dropped") else ""
+    print(f"{Colors.GREEN}Local index: {counts['indexed']} indexed, {counts['removed']} removed, "
+          f"{counts['skipped']} skipped (not text){embedded} in {time.perf_counter() - start_time:.1f}s{Colors.ENDC}")
+
+def upload_many(client, paths, store_name, workers, batch_size, timeout, manifest, sync_root=None,
+                local_index=False, dense=False):
+    """Directory/glob mode: uploads only new or changed files, batched attach, throughput summary.
+
+    Changed files replace their previous upload. With `sync_root`, files recorded
+    under that directory that no longer exist are detached and deleted too.
+    """
+    vector_store_id = ensure_vector_store(client, store_name, manifest)
+    if not vector_store_id:
+        print(f"{Colors.RED}Vector store creation failed.{Colors.ENDC}")
+        exit(1)
+
+    start_time = time.perf_counter()
+    plan = manifest.plan(vector_store_id, paths, root=sync_root)
+    known = manifest.files(vector_store_id)
+    print(f"{Colors.BLUE}{len(plan['new'])} new, {len(plan['changed'])} changed, {len(plan['unchanged'])} unchanged, "
+          f"{len(plan['removed'])} removed ({time.perf_counter() - start_time:.1f}s to compare){Colors.ENDC}")
+
+    to_upload = {path: (digest, size, mtime_ns) for path, digest, size, mtime_ns in plan["new"] + plan["changed"]}
+    total_bytes = sum(size for _, size, _ in to_upload.values())
+    if to_upload:
+        print(f"{Colors.YELLOW}Uploading {len(to_upload)} files ({total_bytes / 1e6:.1f} MB) with {workers} workers...{Colors.ENDC}")
+    upload_start = time.perf_counter()
+    uploaded, failed = upload_files(client, list(to_upload), workers) if to_upload else ({}, [])
+    upload_seconds = time.perf_counter() - upload_start
+    uploaded_bytes = sum(to_upload[p][1] for p in uploaded)
+
+    attached = {}
+    if uploaded:
+        print(f"{Colors.YELLOW}Attaching {len(uploaded)} files to the vector store in batches of {batch_size}...{Colors.ENDC}")
+        unattached = add_files_to_vector_store(client, vector_store_id, list(uploaded.values()), batch_size)
+        if unattached:
+            # Never recorded, so delete the uploads now instead of orphaning them; the next sync retries
+            detach_files(client, vector_store_id, list(unattached))
+            failed += [(path, f"attach failed: {unattached[file_id]}") for path, file_id in uploaded.items()
+                       if file_id in unattached]
+        attached = {path: file_id for path, file_id in uploaded.items() if file_id not in unattached}
+        for path, file_id in attached.items():
+            digest, size, mtime_ns = to_upload[path]
+            manifest.record(vector_store_id, path, digest, size, mtime_ns, file_id, "in_progress")
+
+    # The new versions are attached, now drop the old ones and the deleted files
+    stale = [known[path]["file_id"] for path in attached if path in known]
+    stale += [row["file_id"] for row in plan["removed"]]
+    if stale:
+        print(f"{Colors.YELLOW}Detaching {len(stale)} replaced or removed files...{Colors.ENDC}")
+        detach_files(client, vector_store_id, stale)
+        for row in plan["removed"]:
+            manifest.remove(vector_store_id, row["path"])
+
+    print(f"{Colors.YELLOW}Vector store is processing the files...{Colors.ENDC}")
+    ingestion = wait_for_ingestion(client, vector_store_id, attached.values(), timeout=timeout)
+    manifest.set_status(vector_store_id, ingestion["completed"], "completed")
+    manifest.set_status(vector_store_id, ingestion["failed"], "failed")
+    ingested = report_ingestion(ingestion)
+    if local_index:
+        update_local_index(client, vector_store_id, manifest, dense)
+    total_seconds = time.perf_counter() - start_time
+
+    print(f"\n{Colors.BOLD}Summary{Colors.ENDC}")
+    print(f"  Uploaded:   {len(uploaded)}/{len(to_upload)} files, {uploaded_bytes / 1e6:.1f} MB in {upload_seconds:.1f}s "
+          f"({len(plan['unchanged'])} unchanged skipped)")
+    if upload_seconds > 0 and uploaded:
+        print(f"  Throughput: {len(uploaded) / upload_seconds:.1f} files/s, {uploaded_bytes / 1e6 / upload_seconds:.2f} MB/s")
+    if len(attached) < len(uploaded):
+        print(f"  Attached:   {len(attached)}/{len(uploaded)} files (the others were deleted again)")
+    print(f"  Total time: {total_seconds:.1f}s (compare + upload + attach + processing)")
+    print(f"  Processed:  {len(ingestion['completed'])} completed, {len(ingestion['failed'])} failed, "
+          f"{len(ingestion['pending'])} still pending")
+    for path, error in failed:
+        print(f"{Colors.RED}  Failed: {path}: {error}{Colors.ENDC}")
+    if failed or not ingested:
+        exit(1)
+    print(f"{Colors.GREEN}All operations completed successfully.{Colors.ENDC}")
+
+def main(args):
+    # The SDK import overlaps with opening the manifest and collecting the files
+    warm_up(openai_client)
+    manifest = Manifest()
+
+    if not args.file:
+        paths = collect_files(args.dir, args.glob)
+        if not paths and not args.sync:
+            print(f"{Colors.RED}No files found.{Colors.ENDC}")
+            exit(1)
+        upload_many(openai_client(), paths, args.store, max(1, args.workers), max(1, min(args.batch_size, FILE_BATCH_SIZE)),
+                    args.timeout, manifest, sync_root=args.dir if args.sync else None,
+                    local_index=args.local_index, dense=args.dense)
+        exit(0)
+
+    # Check if the vector store exists
+    client = openai_client()
+    vector_store_id = ensure_vector_store(client, args.store, manifest)
+    if not vector_store_id:
+        print(f"{Colors.RED}Vector store creation failed.{Colors.ENDC}")
+        exit(1)
+
+    # Skip the upload if this exact content is already in the store
+    plan = manifest.plan(vector_store_id, [args.file])
+    if plan["unchanged"]:
+        print(f"{Colors.GREEN}File is unchanged since the last upload to '{args.store}', nothing to do.{Colors.ENDC}")
+        if args.local_index:
+            update_local_index(client, vector_store_id, manifest, args.dense)
+        exit(0)
+    path, digest, size, mtime_ns = (plan["new"] + plan["changed"])[0]
+    previous = manifest.files(vector_store_id).get(path)
 
     # Create the file
-    args = ap.parse_args()
     file_id = create_file(client, args.file)
     if not file_id:
         print(f"{Colors.RED}File upload failed.{Colors.ENDC}")
@@ -74,42 +372,54 @@ if __name__ == "__main__":
 
     print(f"{Colors.GREEN}File uploaded successfully. File ID: {file_id}{Colors.ENDC}")
 
-    # Check if the vector store exists
-    exists, vector_store_id = vector_store_exists(client, args.store)
-    if not exists:
-        vector_store_id = create_vector_store(client, args.store)
-        if not vector_store_id:
-            print(f"{Colors.RED}Vector store creation failed.{Colors.ENDC}")
-            exit(1)
-        print(f"{Colors.GREEN}Vector store '{args.store}' created with ID: {vector_store_id}{Colors.ENDC}")
-    else:
-        print(f"{Colors.GREEN}Vector store '{args.store}' already exists with ID: {vector_store_id}{Colors.ENDC}")
-
     # Add the file to the vector store
     add_result = add_file_to_vector_store(client, vector_store_id, file_id)
     if not add_result:
         print(f"{Colors.RED}Failed to add file to vector store.{Colors.ENDC}")
         exit(1)
     print(f"{Colors.GREEN}File added to vector store successfully.{Colors.ENDC}")
+    manifest.record(vector_store_id, path, digest, size, mtime_ns, file_id, "in_progress")
+    if previous:
+        print(f"{Colors.YELLOW}Detaching the previous version ({previous['file_id']})...{Colors.ENDC}")
+        detach_files(client, vector_store_id, [previous["file_id"]])
 
     # Check if the uploaded file is processed by the vector store
     print(f"{Colors.YELLOW}Vector store is processing the file...{Colors.ENDC}")
-    while True:
-        response = client.vector_stores.files.list(vector_store_id=vector_store_id)
-        files = response.data or []
-        statuses = [f.status for f in files if f.id == file_id]
-
-        if any(s == "failed" for s in statuses):
-            print(f"{Colors.RED}File processing in vector store failed.{Colors.ENDC}")
-            exit(1)
-        if any(s == "completed" for s in statuses):
-            break
-
-    print(f"{Colors.GREEN}File processed into vector store successfully.{Colors.ENDC}")
+    ingestion = wait_for_ingestion(client, vector_store_id, [file_id], timeout=args.timeout)
+    manifest.set_status(vector_store_id, ingestion["completed"], "completed")
+    manifest.set_status(vector_store_id, ingestion["failed"], "failed")
+    if not report_ingestion(ingestion):
+        print(f"{Colors.RED}File processing in vector store failed.{Colors.ENDC}")
+        exit(1)
 
     print(f"{Colors.GREEN}File processed into vector store successfully.{Colors.ENDC}")
+    if args.local_index:
+        update_local_index(client, vector_store_id, manifest, args.dense)
     print(f"{Colors.GREEN}All operations completed successfully.{Colors.ENDC}")
     print(f"{Colors.GREEN}You can continue with 10_client.py to interact with the vector store.{Colors.ENDC}")
 
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Upload files to OpenAI API")
+    source = ap.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", type=str, help="Path to the file to upload")
+    source.add_argument("--dir", type=str, help="Upload every file under this directory")
+    source.add_argument("--glob", type=str, help="Upload every file matching this pattern (e.g. 'docs/**/*.pdf')")
+    ap.add_argument("--store", type=str, help="Name of the vector store to create", required=True)
+    ap.add_argument("--workers", type=int, default=8, help="Concurrent uploads for --dir/--glob")
+    ap.add_argument("--batch-size", type=int, default=FILE_BATCH_SIZE, help="Files per vector store file batch (max 500)")
+    ap.add_argument("--timeout", type=float, default=600, help="Seconds to wait for vector store processing")
+    ap.add_argument("--sync", action="store_true",
+                    help="With --dir: also detach files that were uploaded from the directory but no longer exist")
+    ap.add_argument("--local-index", action="store_true",
+                    help="Also mirror the processed files into a local retrieval index (BM25) for offline search")
+    ap.add_argument("--dense", action="store_true",
+                    help="With --local-index: also store embeddings for hybrid search (needs numpy)")
 
-
+    instrumentation.add_arguments(ap)
+    args = ap.parse_args()
+    if args.sync and not args.dir:
+        ap.error("--sync requires --dir")
+    if args.dense and not args.local_index:
+        ap.error("--dense requires --local-index")
+    with instrumentation.session(args, "upload"):
+        main(args)
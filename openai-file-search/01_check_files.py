@@ -1,66 +1,102 @@
+import argparse
 import os
 import sys
-from openai import OpenAI
-from dotenv import load_dotenv
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
 # Add parent directory to path
-sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from clients import openai_client
 from helpers import Colors
-
-# Load environment variables from .env file
-BASE = os.path.dirname(os.path.dirname(__file__)) if "__file__" in globals() else os.getcwd()
-load_dotenv(dotenv_path=os.path.join(BASE, '.env'), verbose=True)
-api_key = os.getenv("OPENAI_API_KEY")
-client=OpenAI(api_key=api_key)
-VECTOR_STORE_ID = os.getenv("OPENAI_VECTOR_STORE_ID")
-
-def check_vector_store():
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
+import instrumentation
+from instrumentation import span
+from manifest import Manifest
+
+VECTOR_STORE_ID = config.OPENAI_VECTOR_STORE_ID
+
+def fetch_filenames(client, file_ids, manifest, workers):
+    """Resolves file ids to filenames: cached ones locally, the rest concurrently.
+
+    Newly fetched names are written back to the manifest's filename cache.
+    """
+    filenames = manifest.filenames(file_ids)
+    missing = [file_id for file_id in file_ids if file_id not in filenames]
+
+    def retrieve(file_id):
+        try:
+            return file_id, client.files.retrieve(file_id).filename
+        except Exception:
+            return file_id, None
+
+    if missing:
+        print(f"{Colors.YELLOW}Fetching {len(missing)} filenames ({len(filenames)} cached)...{Colors.ENDC}")
+        with span("filenames.fetch", files=len(missing)), ThreadPoolExecutor(max_workers=workers) as pool:
+            fetched = {file_id: name for file_id, name in pool.map(retrieve, missing) if name}
+        manifest.set_filenames(fetched)
+        filenames.update(fetched)
+    return filenames
+
+def check_vector_store(summary_only=False, workers=16):
+    if not config.OPENAI_API_KEY:
         print(f"{Colors.RED}Error: OPENAI_API_KEY not found in .env{Colors.ENDC}")
         return
 
-    client = OpenAI(api_key=api_key)
+    client = openai_client()
 
     print(f"{Colors.HEADER}--- Checking Vector Store: {VECTOR_STORE_ID} ---{Colors.ENDC}\n")
 
     try:
-        vs = client.vector_stores.retrieve(vector_store_id=VECTOR_STORE_ID)
+        with span("vector_store.retrieve"):
+            vs = client.vector_stores.retrieve(vector_store_id=VECTOR_STORE_ID)
         print(f"Store Name: {Colors.BOLD}{vs.name}{Colors.ENDC}")
         print(f"Status:     {vs.status}")
         print(f"File Count: {vs.file_counts.total}")
         print("-" * 50)
 
-        vs_files = client.vector_stores.files.list(vector_store_id=VECTOR_STORE_ID)
-
-        found_files = list(vs_files)
+        # Iterating the page object follows the pagination cursor; 100 is the largest page size
+        with span("files.list") as list_span:
+            found_files = list(client.vector_stores.files.list(vector_store_id=VECTOR_STORE_ID, limit=100))
+            list_span.set(files=len(found_files))
 
         if not found_files:
             print(f"{Colors.YELLOW}No files found in this Vector Store.{Colors.ENDC}")
             return
 
-        print(f"\n{Colors.BLUE}File List:{Colors.ENDC}")
-        print(f"{'Filename':<40} | {'Status':<15} | {'Size (Bytes)':<15}")
-        print("-" * 75)
+        manifest = Manifest()
+        statuses = Counter(f.status for f in found_files)
+
+        if summary_only:
+            # Only the failed files are worth a name lookup
+            failed = [f for f in found_files if f.status == 'failed']
+            filenames = fetch_filenames(client, [f.id for f in failed], manifest, workers)
+            print(f"\n{Colors.BLUE}Summary:{Colors.ENDC}")
+            for status, count in statuses.most_common():
+                print(f"  {status:<15} {count}")
+            print(f"  {'usage (bytes)':<15} {sum(f.usage_bytes or 0 for f in found_files)}")
+            for vs_file in failed:
+                print(f"{Colors.RED}  {filenames.get(vs_file.id, vs_file.id)} -> Error: {vs_file.last_error}{Colors.ENDC}")
+        else:
+            filenames = fetch_filenames(client, [f.id for f in found_files], manifest, workers)
+
+            print(f"\n{Colors.BLUE}File List:{Colors.ENDC}")
+            print(f"{'Filename':<40} | {'Status':<15} | {'Size (Bytes)':<15}")
+            print("-" * 75)
 
-        for vs_file in found_files:
-            try:
-                file_details = client.files.retrieve(vs_file.id)
-                filename = file_details.filename
-            except Exception:
-                filename = "Unknown Filename"
+            for vs_file in found_files:
+                filename = filenames.get(vs_file.id, "Unknown Filename")
 
-            status_color = Colors.GREEN if vs_file.status == 'completed' else Colors.RED
-            if vs_file.status == 'in_progress': status_color = Colors.YELLOW
+                status_color = Colors.GREEN if vs_file.status == 'completed' else Colors.RED
+                if vs_file.status == 'in_progress': status_color = Colors.YELLOW
 
-            print(f"{filename:<40} | {status_color}{vs_file.status:<15}{Colors.ENDC} | {vs_file.usage_bytes}")
+                print(f"{filename:<40} | {status_color}{vs_file.status:<15}{Colors.ENDC} | {vs_file.usage_bytes}")
 
-            if vs_file.status == 'failed':
-                print(f"{Colors.RED}  -> Error: {vs_file.last_error}{Colors.ENDC}")
+                if vs_file.status == 'failed':
+                    print(f"{Colors.RED}  -> Error: {vs_file.last_error}{Colors.ENDC}")
 
         print("\n" + "-" * 50)
 
-        if all(f.status == 'completed' for f in found_files):
+        if statuses.get('completed', 0) == len(found_files):
              print(f"{Colors.GREEN}✔ All files are ready for search.{Colors.ENDC}")
         else:
              print(f"{Colors.RED}✘ Some files are not ready or failed.{Colors.ENDC}")
@@ -69,4 +105,10 @@ def check_vector_store():
         print(f"{Colors.RED}Critical Error: {e}{Colors.ENDC}")
 
 if __name__ == "__main__":
-    check_vector_store()
\ No newline at end of file
+    ap = argparse.ArgumentParser(description="Check the files of the configured vector store")
+    ap.add_argument("--summary", action="store_true", help="Only print status counts and failed files (for very large stores)")
+    ap.add_argument("--workers", type=int, default=16, help="Concurrent filename lookups for files not in the local cache")
+    instrumentation.add_arguments(ap)
+    args = ap.parse_args()
+    with instrumentation.session(args, "check"):
+        check_vector_store(summary_only=args.summary, workers=max(1, args.workers))
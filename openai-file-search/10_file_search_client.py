@@ -1,61 +1,221 @@
-from openai import OpenAI
-import os, sys
-from dotenv import load_dotenv
+import argparse
+import os, sys, time
 # Add parent directory to path
-sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from clients import openai, openai_client, warm_up
 from helpers import Colors
+import instrumentation
+from instrumentation import span
+from answer_cache import AnswerCache, store_version
+from local_index import LocalIndex, default_dir, openai_embedder
 
-# Load environment variables from .env file
-BASE = os.path.dirname(os.path.dirname(__file__)) if "__file__" in globals() else os.getcwd()
-load_dotenv(dotenv_path=os.path.join(BASE, '.env'), verbose=True)
-api_key = os.getenv("OPENAI_API_KEY")
-vector_store_id = os.getenv("OPENAI_VECTOR_STORE_ID")
-client=OpenAI(api_key=api_key)
+vector_store_id = config.OPENAI_VECTOR_STORE_ID
+# How long the vector store's version marker is trusted before it is fetched again
+STORE_VERSION_TTL = float(os.getenv("STORE_VERSION_TTL", "30"))
+_store_version = {"value": None, "checked_at": 0.0}
 
-def speak():
+def offline_errors():
+    """Failures that mean the API is unreachable, where the local index can still answer."""
+    return (openai.APIConnectionError, openai.APITimeoutError)
 
-    print(f"{Colors.GREEN}System ready. Type 'quit' to exit.{Colors.ENDC}\n")
-    history=[]
-    while True:
-        user_input = input(f"{Colors.BOLD}You: {Colors.ENDC}")
-        if user_input.lower() in ['quit', 'exit', 'q']:
-            break
-        history.append({"role": "user", "content": user_input})
-        # Call model
-        print(f"{Colors.YELLOW}Thinking...{Colors.ENDC}", end="\r")
-        response = client.responses.create(
+def current_store_version():
+    """The store's version marker, re-fetched at most every STORE_VERSION_TTL seconds."""
+    if _store_version["value"] is None or time.monotonic() - _store_version["checked_at"] > STORE_VERSION_TTL:
+        with span("vector_store.retrieve"):
+            _store_version["value"] = store_version(openai_client().vector_stores.retrieve(vector_store_id))
+        _store_version["checked_at"] = time.monotonic()
+    return _store_version["value"]
+
+def annotation_filename(annotation):
+    if isinstance(annotation, dict):
+        return annotation.get('filename')
+    return getattr(annotation, 'filename', None)
+
+def stream_response(model_input, previous_response_id=None, tools=None):
+    """Streams one answer, printing text and file citations as they arrive.
+
+    Earlier turns are not re-sent: the server continues from `previous_response_id`.
+    Returns (response id, answer text, cited sources, timings).
+    """
+    start_time = time.perf_counter()
+    first_token_time = None
+    answer_parts = []
+    sources = []
+    response_id = None
+
+    with span("model.response", chained=previous_response_id is not None,
+              file_search=bool(tools)) as response_span:
+        stream = openai_client().responses.create(
             model="gpt-5-nano",
-            input=user_input,
-            tools=[{
-                "type": "file_search",
-                "vector_store_ids": [vector_store_id]
-            }]
+            input=model_input,
+            previous_response_id=previous_response_id,
+            tools=tools or [],
+            stream=True,
         )
 
-        answer = "No text response found."
-        sources = []
+        for event in stream:
+            if event.type == 'response.created':
+                response_id = event.response.id
+            elif event.type == 'response.output_text.delta':
+                if first_token_time is None:
+                    first_token_time = time.perf_counter()
+                    print(f"\n{Colors.GREEN}Model:{Colors.ENDC} ", end="", flush=True)
+                print(event.delta, end="", flush=True)
+                answer_parts.append(event.delta)
+            elif event.type == 'response.output_text.annotation.added':
+                src_name = annotation_filename(event.annotation)
+                if src_name and src_name not in sources:
+                    sources.append(src_name)
+                    print(f"{Colors.CYAN} [{src_name}]{Colors.ENDC}", end="", flush=True)
+            elif event.type == 'response.completed':
+                response_id = event.response.id
+            elif event.type in ('response.failed', 'error'):
+                print(f"\n{Colors.RED}Response failed: {getattr(event, 'message', None) or event}{Colors.ENDC}")
+        response_span.set(ttft_ms=round(((first_token_time or time.perf_counter()) - start_time) * 1000, 1))
+
+    end_time = time.perf_counter()
+    timings = {
+        'ttft': (first_token_time or end_time) - start_time,
+        'total': end_time - start_time,
+    }
+    return response_id, "".join(answer_parts), sources, timings
+
+def ask(user_input, previous_response_id=None):
+    """Answers with the hosted `file_search` tool doing retrieval."""
+    return stream_response(user_input, previous_response_id,
+                           tools=[{"type": "file_search", "vector_store_ids": [vector_store_id]}])
 
-        for item in response.output:
-            if item.type == 'message':
-                for content_part in item.content:
-                    if content_part.type == 'output_text':
-                        answer = content_part.text
+def open_local_index():
+    """The local index built by `00_upload_file.py --local-index`, or None if there is none."""
+    directory = default_dir(vector_store_id)
+    if not os.path.exists(os.path.join(directory, "index.sqlite")):
+        return None
+    return LocalIndex(directory)
 
-                        if content_part.annotations:
-                            for annotation in content_part.annotations:
-                                src_name = getattr(annotation, 'filename', None)
-                                if src_name and src_name not in sources:
-                                    sources.append(src_name)
+def retrieve_local(index, query, k, dense=True):
+    """Searches the local index; dense scoring is used only if the query can be embedded."""
+    query_vector = None
+    if dense and index.has_vectors():
+        try:
+            with span("embed.query"):
+                query_vector = openai_embedder(openai_client())([query])[0]
+        except offline_errors():
+            pass
+    with span("local.retrieve", k=k, dense=query_vector is not None):
+        return index.search(query, k, query_vector)
 
-                        if sources:
-                            answer += "\n\nSources:\n"
-                            for src in sources:
-                                answer += f"- {src}\n"
+def ask_local(index, user_input, previous_response_id, k):
+    """Answers from passages retrieved locally instead of the hosted `file_search` tool."""
+    start_time = time.perf_counter()
+    hits = retrieve_local(index, user_input, k)
+    retrieval_time = time.perf_counter() - start_time
+    passages = "\n\n".join(f"[{hit['filename']}]\n{hit['text']}" for hit in hits) or "(no matching passages)"
+    model_input = (f"Answer the question using only these excerpts from the user's documents. "
+                   f"Say so if they do not contain the answer.\n\n{passages}\n\nQuestion: {user_input}")
+    response_id, answer, _, timings = stream_response(model_input, previous_response_id)
+    timings['retrieval'] = retrieval_time
+    sources = list(dict.fromkeys(hit['filename'] for hit in hits))
+    return response_id, answer, sources, timings
 
-                        history.append({"role": "assistant", "content": answer})
-                        break
+def print_passages(hits):
+    """Offline answer: the best matching passages themselves."""
+    if not hits:
+        print(f"\n{Colors.YELLOW}No matching passages in the local index.{Colors.ENDC}\n")
+        return
+    print(f"\n{Colors.YELLOW}API unreachable, most relevant local passages:{Colors.ENDC}\n")
+    for hit in hits:
+        excerpt = hit['text'] if len(hit['text']) <= 500 else hit['text'][:500] + "…"
+        print(f"{Colors.CYAN}[{hit['filename']}] (score {hit['score']:.2f}){Colors.ENDC}\n{excerpt}\n")
+
+def print_sources(sources):
+    if sources:
+        print("Sources:")
+        for src in sources:
+            print(f"- {src}")
+        print()
+
+def speak(retrieval="remote", top_k=5):
+
+    index = open_local_index() if retrieval != "remote" else None
+    if retrieval == "local" and index is None:
+        print(f"{Colors.RED}No local index for {vector_store_id}. Build it with 00_upload_file.py --local-index.{Colors.ENDC}")
+        return
+    if index is not None:
+        stats = index.stats()
+        print(f"{Colors.BLUE}Local index: {stats['documents']} documents, {stats['chunks']} chunks"
+              f"{', dense vectors' if index.has_vectors() else ''}{Colors.ENDC}")
+    # The SDK loads while the first question is typed
+    warm_up(openai_client)
+    print(f"{Colors.GREEN}System ready. Type 'new' to start a new conversation, 'quit' to exit.{Colors.ENDC}\n")
+    cache = AnswerCache()
+    # Local answers depend on the BM25 passages picked, hosted ones on file_search: cache them apart
+    cache_mode = f"local:{top_k}" if retrieval == "local" else "remote"
+    previous_response_id = None
+    while True:
+        user_input = input(f"{Colors.BOLD}You: {Colors.ENDC}")
+        if user_input.lower() in ['quit', 'exit', 'q']:
+            break
+        if user_input.lower() == 'new':
+            previous_response_id = None
+            print(f"{Colors.BLUE}New conversation.{Colors.ENDC}\n")
+            continue
+
+        # Only a conversation's opening question is context-free enough to answer from the cache
+        standalone = previous_response_id is None
+        if standalone:
+            start_time = time.perf_counter()
+            try:
+                version = current_store_version()
+            except offline_errors():
+                version = None
+            with span("answer_cache.lookup"):
+                cached = cache.get(user_input, vector_store_id, version, cache_mode) if version else None
+            if cached:
+                print(f"\n{Colors.GREEN}Model:{Colors.ENDC} {cached['answer']}\n")
+                print_sources(cached['sources'])
+                print(f"{Colors.CYAN}⚡ cached answer in {(time.perf_counter() - start_time) * 1000:.0f}ms | "
+                      f"cache hit rate {cache.hit_rate():.0%}{Colors.ENDC}\n")
+                # Follow-ups continue from the conversation that produced the cached answer
+                previous_response_id = cached['response_id']
+                continue
+
+        # Call model
+        print(f"{Colors.YELLOW}Thinking...{Colors.ENDC}", end="\r")
+        try:
+            if retrieval == "local":
+                response_id, answer, sources, timings = ask_local(index, user_input, previous_response_id, top_k)
+            else:
+                response_id, answer, sources, timings = ask(user_input, previous_response_id)
+        except offline_errors() as e:
+            if index is None:
+                print(f"\n{Colors.RED}API unreachable: {e}{Colors.ENDC}\n")
+                continue
+            start_time = time.perf_counter()
+            # The API is unreachable, so don't try to embed the query either
+            print_passages(retrieve_local(index, user_input, top_k, dense=False))
+            print(f"{Colors.CYAN}⚡ local retrieval in {(time.perf_counter() - start_time) * 1000:.0f}ms{Colors.ENDC}\n")
+            continue
+        # Only chain to a response the server actually stored
+        previous_response_id = response_id or previous_response_id
+        if standalone and answer and version:
+            cache.put(user_input, vector_store_id, version, answer, sources, response_id, cache_mode)
 
-        print(f"\n{Colors.GREEN}Model:{Colors.ENDC} {answer}\n")
+        if not answer:
+            print(f"\n{Colors.GREEN}Model:{Colors.ENDC} No text response found.", end="")
+        print("\n")
+        print_sources(sources)
+        retrieval_note = f"local retrieval {timings['retrieval'] * 1000:.0f}ms | " if 'retrieval' in timings else ""
+        print(f"{Colors.CYAN}⏱  {retrieval_note}TTFT {timings['ttft']:.2f}s | total {timings['total']:.2f}s | "
+              f"cache hit rate {cache.hit_rate():.0%}{Colors.ENDC}\n")
 
 if __name__ == "__main__":
-    speak()
\ No newline at end of file
+    ap = argparse.ArgumentParser(description="Chat with the documents of the configured vector store")
+    ap.add_argument("--retrieval", choices=["remote", "local", "auto"], default="remote",
+                    help="remote: hosted file_search; local: retrieve from the local index; "
+                         "auto: hosted file_search, falling back to the local index when the API is unreachable")
+    ap.add_argument("--top-k", type=int, default=5, help="Passages retrieved from the local index per question")
+    instrumentation.add_arguments(ap)
+    args = ap.parse_args()
+    with instrumentation.session(args, "file-search"):
+        speak(args.retrieval, max(1, args.top_k))
\ No newline at end of file
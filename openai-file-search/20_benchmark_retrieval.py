@@ -0,0 +1,99 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from clients import openai_client
+from helpers import Colors
+import instrumentation
+from instrumentation import percentile
+from local_index import LocalIndex, default_dir, openai_embedder
+
+VECTOR_STORE_ID = config.OPENAI_VECTOR_STORE_ID
+
+DEFAULT_QUERIES = [
+    "Summarize the main points of the document",
+    "What does it say about deadlines?",
+    "List the requirements",
+    "refund policy",
+]
+
+def timed(fn, runs):
+    """Runs fn `runs` times; returns (latencies in ms, last result)."""
+    latencies = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies, result
+
+def print_row(label, latencies):
+    print(f"{label:<22} {percentile(latencies, 50):>9.1f} {percentile(latencies, 95):>9.1f} "
+          f"{min(latencies):>9.1f} {max(latencies):>9.1f}")
+
+def benchmark(queries, runs, k, dense):
+    if not config.OPENAI_API_KEY:
+        print(f"{Colors.RED}Error: OPENAI_API_KEY not found in .env{Colors.ENDC}")
+        return
+    directory = default_dir(VECTOR_STORE_ID)
+    if not os.path.exists(os.path.join(directory, "index.sqlite")):
+        print(f"{Colors.RED}No local index for {VECTOR_STORE_ID}. Build it with 00_upload_file.py --local-index.{Colors.ENDC}")
+        return
+
+    client = openai_client()
+    index = LocalIndex(directory)
+    stats = index.stats()
+    dense = dense and index.has_vectors()
+    print(f"{Colors.HEADER}--- Retrieval benchmark: {VECTOR_STORE_ID} ---{Colors.ENDC}")
+    print(f"Local index: {stats['documents']} documents, {stats['chunks']} chunks; "
+          f"{len(queries)} queries x {runs} runs, top {k}\n")
+
+    local_ms, dense_ms, remote_ms, overlaps = [], [], [], []
+    embed = openai_embedder(client)
+    for query in queries:
+        latencies, local_hits = timed(lambda: index.search(query, k), runs)
+        local_ms += latencies
+        if dense:
+            # Includes embedding the query, which is what the chat client pays per question
+            latencies, _ = timed(lambda: index.search(query, k, embed([query])[0]), runs)
+            dense_ms += latencies
+        latencies, remote_hits = timed(
+            lambda: client.vector_stores.search(vector_store_id=VECTOR_STORE_ID, query=query, max_num_results=k).data,
+            runs)
+        remote_ms += latencies
+        local_files = {hit["filename"] for hit in local_hits}
+        remote_files = {hit.filename for hit in remote_hits}
+        if remote_files:
+            overlaps.append(len(local_files & remote_files) / len(remote_files))
+
+    print(f"{Colors.BOLD}{'Retrieval (ms)':<22} {'p50':>9} {'p95':>9} {'min':>9} {'max':>9}{Colors.ENDC}")
+    print_row("local BM25", local_ms)
+    if dense_ms:
+        print_row("local hybrid (+embed)", dense_ms)
+    print_row("remote vector store", remote_ms)
+    speedup = percentile(remote_ms, 50) / max(percentile(local_ms, 50), 1e-6)
+    print(f"\n{Colors.GREEN}Local BM25 is {speedup:.0f}x faster at the median.{Colors.ENDC}")
+    if overlaps:
+        print(f"Source agreement: {statistics.mean(overlaps):.0%} of the remote top-{k} files also found locally")
+    index.close()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Compare local index and hosted vector store retrieval latency")
+    ap.add_argument("--queries", type=str, help="File with one query per line (default: a few sample questions)")
+    ap.add_argument("--runs", type=int, default=5, help="Repetitions per query and backend")
+    ap.add_argument("--top-k", type=int, default=5, help="Results per query")
+    ap.add_argument("--dense", action="store_true", help="Also time hybrid search (requires an index built with --dense)")
+    instrumentation.add_arguments(ap)
+    args = ap.parse_args()
+    if args.queries:
+        with open(args.queries) as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        queries = DEFAULT_QUERIES
+    with instrumentation.session(args, "benchmark-retrieval"):
+        benchmark(queries, max(1, args.runs), max(1, args.top_k), args.dense)
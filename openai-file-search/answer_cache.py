@@ -0,0 +1,93 @@
+"""
+Persistent local cache of file_search answers.
+
+Entries are keyed by the normalized question, the vector store id, a store version
+marker and the retrieval mode that produced the answer, so any change to the store's
+files invalidates them and hosted and local answers are never served for each other. Old entries expire after a
+TTL and the least recently used ones are evicted above a size bound.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    key TEXT PRIMARY KEY,
+    vector_store_id TEXT NOT NULL,
+    version TEXT NOT NULL,
+    query TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    sources TEXT NOT NULL,
+    response_id TEXT,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS answers_lru ON answers (last_used_at);
+"""
+
+def default_path():
+    """Cache location: $ANSWER_CACHE or `.answer_cache.sqlite` in the repo root."""
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.getenv("ANSWER_CACHE", os.path.join(repo_root, ".answer_cache.sqlite"))
+
+def normalize_query(query):
+    """Lowercases, collapses whitespace and drops trailing punctuation."""
+    return re.sub(r"\s+", " ", query).strip().lower().rstrip("?!. ")
+
+def store_version(vector_store):
+    """A marker that changes whenever files are added, removed or re-processed."""
+    counts = vector_store.file_counts
+    return f"{counts.total}:{counts.completed}:{counts.failed}:{vector_store.usage_bytes}"
+
+class AnswerCache:
+    def __init__(self, path=None, ttl=None, max_entries=None):
+        self.path = path or default_path()
+        self.ttl = ttl if ttl is not None else float(os.getenv("ANSWER_CACHE_TTL", str(7 * 24 * 3600)))
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+        self.db = sqlite3.connect(self.path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, query, vector_store_id, version, mode):
+        raw = f"{vector_store_id}\0{version}\0{mode}\0{normalize_query(query)}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, query, vector_store_id, version, mode="remote"):
+        """Returns {'answer', 'sources', 'response_id'} or None."""
+        now = time.time()
+        with self.db:
+            # Anything cached against another version of this store is stale
+            self.db.execute("DELETE FROM answers WHERE vector_store_id = ? AND version != ?", (vector_store_id, version))
+            self.db.execute("DELETE FROM answers WHERE created_at < ?", (now - self.ttl,))
+            row = self.db.execute("SELECT * FROM answers WHERE key = ?",
+                                  (self._key(query, vector_store_id, version, mode),)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.db.execute("UPDATE answers SET last_used_at = ?, hits = hits + 1 WHERE key = ?", (now, row["key"]))
+        self.hits += 1
+        return {"answer": row["answer"], "sources": json.loads(row["sources"]), "response_id": row["response_id"]}
+
+    def put(self, query, vector_store_id, version, answer, sources, response_id=None, mode="remote"):
+        now = time.time()
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (self._key(query, vector_store_id, version, mode), vector_store_id, version, normalize_query(query),
+                 answer, json.dumps(sources), response_id, now, now),
+            )
+            self.db.execute(
+                "DELETE FROM answers WHERE key IN (SELECT key FROM answers ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
@@ -0,0 +1,268 @@
+"""
+Local retrieval index mirroring the files of a vector store.
+
+Documents are split into overlapping word chunks and kept in SQLite with an inverted
+index scored by BM25, so keyword retrieval works without the network. Optionally each
+chunk is also embedded; the vectors are written to a NumPy file that is memory-mapped
+at query time and blended with the BM25 scores. Only text files are indexed, other
+formats (e.g. PDF) are recorded but skipped.
+"""
+
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import time
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:  # dense vectors are optional
+    np = None
+
+CHUNK_WORDS = int(os.getenv("LOCAL_INDEX_CHUNK_WORDS", "200"))
+CHUNK_OVERLAP = int(os.getenv("LOCAL_INDEX_CHUNK_OVERLAP", "50"))
+EMBEDDING_MODEL = os.getenv("LOCAL_INDEX_EMBEDDING_MODEL", "text-embedding-3-small")
+# Weight of the dense (cosine) score against the normalized BM25 score
+DENSE_WEIGHT = float(os.getenv("LOCAL_INDEX_DENSE_WEIGHT", "0.5"))
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_RE = re.compile(r"\w+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    path TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    chunks INTEGER NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL,
+    ordinal INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_path ON chunks (path);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    chunk_id INTEGER NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, chunk_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_chunk ON postings (chunk_id);
+CREATE TABLE IF NOT EXISTS embeddings (
+    sha256 TEXT PRIMARY KEY,
+    vector BLOB NOT NULL
+);
+"""
+
+def default_dir(vector_store_id):
+    """Index location: $LOCAL_INDEX_DIR/<vector store id> (default `.local_index/` in the repo root)."""
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(os.getenv("LOCAL_INDEX_DIR", os.path.join(repo_root, ".local_index")), vector_store_id)
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+def chunk_text(text, size=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """Splits text into chunks of `size` words, consecutive chunks sharing `overlap` words."""
+    words = text.split()
+    step = max(size - overlap, 1)
+    return [" ".join(words[start:start + size]) for start in range(0, max(len(words) - overlap, 1), step)
+            if words[start:start + size]]
+
+def read_text(path):
+    """Returns the file's text, or None if it is missing or not UTF-8 text."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        if b"\0" in data[:8192]:
+            return None
+        return data.decode("utf-8")
+    except (OSError, UnicodeDecodeError):
+        return None
+
+def openai_embedder(client, model=EMBEDDING_MODEL, batch_size=256):
+    """Returns embed(texts) -> list of vectors backed by the OpenAI embeddings endpoint."""
+    def embed(texts):
+        vectors = []
+        for start in range(0, len(texts), batch_size):
+            response = client.embeddings.create(model=model, input=texts[start:start + batch_size])
+            vectors.extend(item.embedding for item in response.data)
+        return vectors
+    return embed
+
+class LocalIndex:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(directory, "index.sqlite"))
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+        self._stats = None
+        self._vectors = None
+
+    @classmethod
+    def for_store(cls, vector_store_id):
+        return cls(default_dir(vector_store_id))
+
+    def close(self):
+        self.db.close()
+
+    # --- building ---
+
+    def documents(self):
+        """Returns {path: sha256} of every indexed document."""
+        return {row["path"]: row["sha256"] for row in self.db.execute("SELECT path, sha256 FROM documents")}
+
+    def _remove(self, path):
+        self.db.execute("DELETE FROM postings WHERE chunk_id IN (SELECT id FROM chunks WHERE path = ?)", (path,))
+        self.db.execute("DELETE FROM chunks WHERE path = ?", (path,))
+        self.db.execute("DELETE FROM documents WHERE path = ?", (path,))
+
+    def _add(self, path, sha256, text):
+        chunks = chunk_text(text) if text else []
+        for ordinal, chunk in enumerate(chunks):
+            terms = tokenize(chunk)
+            cursor = self.db.execute(
+                "INSERT INTO chunks (path, ordinal, text, length, sha256) VALUES (?, ?, ?, ?, ?)",
+                (path, ordinal, chunk, len(terms), hashlib.sha256(chunk.encode()).hexdigest()),
+            )
+            self.db.executemany("INSERT INTO postings VALUES (?, ?, ?)",
+                                [(term, cursor.lastrowid, tf) for term, tf in Counter(terms).items()])
+        self.db.execute("INSERT INTO documents VALUES (?, ?, ?, ?, ?)",
+                        (path, os.path.basename(path), sha256, len(chunks), time.time()))
+
+    def sync(self, files, embed=None):
+        """Makes the index mirror `files` ({path: sha256}).
+
+        Documents whose hash changed are re-chunked, ones no longer listed are dropped.
+        With `embed`, the dense vectors are rebuilt afterwards (unchanged chunks reuse
+        their cached embeddings). Without it, changed chunks make the existing vectors
+        stale, so they are deleted and search falls back to BM25 until the next dense
+        sync. Returns a dict of counts.
+        """
+        indexed = self.documents()
+        stale = [path for path in indexed if path not in files]
+        changed = {path: sha for path, sha in files.items() if indexed.get(path) != sha}
+        skipped = 0
+        with self.db:
+            for path in stale:
+                self._remove(path)
+            for path, sha in changed.items():
+                self._remove(path)
+                text = read_text(path)
+                skipped += text is None
+                self._add(path, sha, text)
+        self._stats = None
+        counts = {"indexed": len(changed) - skipped, "skipped": skipped, "removed": len(stale)}
+        if embed is not None and (changed or stale or not self.has_vectors()):
+            counts["embedded"] = self.build_vectors(embed)
+        elif (changed or stale) and self.has_vectors():
+            self.drop_vectors()
+            counts["vectors_dropped"] = True
+        return counts
+
+    def build_vectors(self, embed):
+        """Embeds chunks that have no cached vector and rewrites the memory-mapped matrix.
+
+        Returns the number of chunks that needed a new embedding.
+        """
+        if np is None:
+            raise RuntimeError("numpy is required for dense vectors (pip install numpy)")
+        rows = self.db.execute("SELECT id, text, sha256 FROM chunks ORDER BY id").fetchall()
+        cached = {row["sha256"] for row in self.db.execute("SELECT sha256 FROM embeddings")}
+        missing = {row["sha256"]: row["text"] for row in rows if row["sha256"] not in cached}
+        if missing:
+            vectors = embed(list(missing.values()))
+            with self.db:
+                self.db.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?)",
+                                    [(sha, np.asarray(vector, dtype=np.float32).tobytes())
+                                     for sha, vector in zip(missing, vectors)])
+        blobs = dict(self.db.execute("SELECT sha256, vector FROM embeddings"))
+        matrix = np.stack([np.frombuffer(blobs[row["sha256"]], dtype=np.float32) for row in rows]) if rows else \
+            np.zeros((0, 0), dtype=np.float32)
+        if len(matrix):
+            # Normalized once here so a query is a single matrix-vector product
+            matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        self._vectors = None
+        np.save(os.path.join(self.directory, "vectors.npy"), matrix)
+        np.save(os.path.join(self.directory, "vector_ids.npy"), np.array([row["id"] for row in rows], dtype=np.int64))
+        # Embeddings of chunks that no longer exist are not worth keeping
+        with self.db:
+            self.db.execute("DELETE FROM embeddings WHERE sha256 NOT IN (SELECT sha256 FROM chunks)")
+        return len(missing)
+
+    def drop_vectors(self):
+        """Deletes the dense matrix (the cached embeddings stay for the next build)."""
+        self._vectors = None
+        for name in ("vectors.npy", "vector_ids.npy"):
+            path = os.path.join(self.directory, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+    # --- querying ---
+
+    def has_vectors(self):
+        return np is not None and os.path.exists(os.path.join(self.directory, "vectors.npy"))
+
+    def _load_vectors(self):
+        if self._vectors is None and self.has_vectors():
+            self._vectors = (np.load(os.path.join(self.directory, "vectors.npy"), mmap_mode="r"),
+                             np.load(os.path.join(self.directory, "vector_ids.npy"), mmap_mode="r"))
+        return self._vectors
+
+    def stats(self):
+        if self._stats is None:
+            row = self.db.execute("SELECT COUNT(*) AS n, AVG(length) AS avg FROM chunks").fetchone()
+            documents = self.db.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+            self._stats = {"documents": documents, "chunks": row["n"], "avg_length": row["avg"] or 0.0}
+        return self._stats
+
+    def bm25(self, query):
+        """Returns {chunk_id: BM25 score} for chunks containing any query term."""
+        stats = self.stats()
+        n, avg_length = stats["chunks"], stats["avg_length"] or 1.0
+        scores = Counter()
+        for term in set(tokenize(query)):
+            postings = self.db.execute(
+                "SELECT p.chunk_id, p.tf, c.length FROM postings p JOIN chunks c ON c.id = p.chunk_id WHERE p.term = ?",
+                (term,),
+            ).fetchall()
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, tf, length in postings:
+                scores[chunk_id] += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length))
+        return scores
+
+    def search(self, query, k=5, query_vector=None):
+        """Returns the `k` best chunks as dicts with path, filename, text and score.
+
+        With `query_vector` and a dense index, scores blend the max-normalized BM25
+        score with cosine similarity; otherwise they are plain BM25.
+        """
+        scores = self.bm25(query)
+        vectors = self._load_vectors() if query_vector is not None else None
+        if vectors is not None and len(vectors[1]):
+            matrix, ids = vectors
+            q = np.asarray(query_vector, dtype=np.float32)
+            similarity = matrix @ (q / max(float(np.linalg.norm(q)), 1e-12))
+            top_keyword = max(scores.values(), default=0.0) or 1.0
+            candidates = set(scores) | {int(ids[i]) for i in np.argsort(-similarity)[:k * 4]}
+            position = {int(chunk_id): i for i, chunk_id in enumerate(ids)}
+            scores = Counter({chunk_id: (1 - DENSE_WEIGHT) * scores.get(chunk_id, 0.0) / top_keyword
+                              + DENSE_WEIGHT * float(similarity[position[chunk_id]])
+                              for chunk_id in candidates if chunk_id in position})
+        best = scores.most_common(k)
+        if not best:
+            return []
+        rows = {row["id"]: row for row in self.db.execute(
+            f"SELECT id, path, text FROM chunks WHERE id IN ({','.join('?' * len(best))})", [cid for cid, _ in best])}
+        return [{"path": rows[cid]["path"], "filename": os.path.basename(rows[cid]["path"]),
+                 "text": rows[cid]["text"], "score": score} for cid, score in best if cid in rows]
@@ -0,0 +1,141 @@
+"""
+Local SQLite manifest of what has been uploaded to which vector store.
+
+It maps (vector store, path) to the content hash and OpenAI file id of the uploaded
+version, and vector store names to ids, so re-runs only upload what changed.
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stores (
+    name TEXT PRIMARY KEY,
+    vector_store_id TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS filenames (
+    file_id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    vector_store_id TEXT NOT NULL,
+    path TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    file_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    uploaded_at REAL NOT NULL,
+    PRIMARY KEY (vector_store_id, path)
+);
+"""
+
+def default_path():
+    """Manifest location: $UPLOAD_MANIFEST or `.upload_manifest.sqlite` in the repo root."""
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.getenv("UPLOAD_MANIFEST", os.path.join(repo_root, ".upload_manifest.sqlite"))
+
+def sha256_file(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class Manifest:
+    def __init__(self, path=None):
+        self.path = path or default_path()
+        self.db = sqlite3.connect(self.path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    # --- store name -> id index ---
+
+    def store_id(self, name):
+        row = self.db.execute("SELECT vector_store_id FROM stores WHERE name = ?", (name,)).fetchone()
+        return row["vector_store_id"] if row else None
+
+    def set_store(self, name, vector_store_id):
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO stores VALUES (?, ?, ?)", (name, vector_store_id, time.time()))
+
+    def forget_store(self, name):
+        with self.db:
+            self.db.execute("DELETE FROM stores WHERE name = ?", (name,))
+
+    # --- uploaded files ---
+
+    def files(self, vector_store_id):
+        """Returns {path: row} for every file recorded for the store."""
+        rows = self.db.execute("SELECT * FROM files WHERE vector_store_id = ?", (vector_store_id,))
+        return {row["path"]: row for row in rows}
+
+    def record(self, vector_store_id, path, sha256, size, mtime_ns, file_id, status):
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            (vector_store_id, path, sha256, size, mtime_ns, file_id, status, time.time()))
+            self.db.execute("INSERT OR REPLACE INTO filenames VALUES (?, ?)", (file_id, os.path.basename(path)))
+
+    def set_status(self, vector_store_id, file_ids, status):
+        with self.db:
+            self.db.executemany("UPDATE files SET status = ? WHERE vector_store_id = ? AND file_id = ?",
+                                [(status, vector_store_id, file_id) for file_id in file_ids])
+
+    def remove(self, vector_store_id, path):
+        with self.db:
+            self.db.execute("DELETE FROM files WHERE vector_store_id = ? AND path = ?", (vector_store_id, path))
+
+    # --- file id -> filename cache (file ids are immutable, so entries never go stale) ---
+
+    def filenames(self, file_ids):
+        """Returns {file_id: filename} for the ids that are cached."""
+        found = {}
+        file_ids = list(file_ids)
+        for start in range(0, len(file_ids), 500):
+            chunk = file_ids[start:start + 500]
+            rows = self.db.execute(f"SELECT file_id, filename FROM filenames WHERE file_id IN ({','.join('?' * len(chunk))})", chunk)
+            found.update((row["file_id"], row["filename"]) for row in rows)
+        return found
+
+    def set_filenames(self, filenames):
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO filenames VALUES (?, ?)", filenames.items())
+
+    def plan(self, vector_store_id, paths, root=None):
+        """Compares files on disk with the manifest.
+
+        Returns a dict with `new` and `changed` ([(path, sha256, size, mtime_ns)]),
+        `unchanged` (paths) and `removed` (manifest rows under `root` that no longer
+        exist). Files whose size and mtime match the manifest are not re-hashed.
+        Uploads that never finished processing count as changed.
+        """
+        known = self.files(vector_store_id)
+        plan = {"new": [], "changed": [], "unchanged": [], "removed": []}
+        for path in paths:
+            path = os.path.abspath(path)
+            stat = os.stat(path)
+            row = known.get(path)
+            if row and row["status"] == "completed" and row["size"] == stat.st_size and row["mtime_ns"] == stat.st_mtime_ns:
+                plan["unchanged"].append(path)
+                continue
+            digest = sha256_file(path)
+            entry = (path, digest, stat.st_size, stat.st_mtime_ns)
+            if row is None:
+                plan["new"].append(entry)
+            elif row["sha256"] != digest or row["status"] != "completed":
+                plan["changed"].append(entry)
+            else:
+                # Touched but identical: just refresh the fingerprint
+                self.record(vector_store_id, path, digest, stat.st_size, stat.st_mtime_ns, row["file_id"], row["status"])
+                plan["unchanged"].append(path)
+        if root is not None:
+            root = os.path.join(os.path.abspath(root), "")
+            present = {os.path.abspath(p) for p in paths}
+            plan["removed"] = [row for path, row in known.items() if path.startswith(root) and path not in present]
+        return plan
@@ -3,29 +3,44 @@ Docstring for openai-local-shell.00_local_shell_client
 Module that provides a client interface for interacting with the OpenAI Local Shell service.
 """
 
-import os, sys, shlex, subprocess
+import argparse, codecs, json, os, signal, sys, shlex, subprocess, threading, time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from openai import OpenAI
-from dotenv import load_dotenv
 
 # Add parent directory to path
-sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from clients import openai, openai_client, warm_up
 from helpers import Colors
+import instrumentation
+from instrumentation import span
+from journal import SessionJournal, read_history
+from read_only import is_read_only
 
-# Environment Setup
-BASE = os.path.dirname(os.path.dirname(__file__)) if "__file__" in globals() else os.getcwd()
-load_dotenv(dotenv_path=os.path.join(BASE, '.env'), verbose=True)
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Command output kept for the model: the first and last bytes, the middle is dropped
+OUTPUT_HEAD_BYTES = int(os.getenv("SHELL_OUTPUT_HEAD_BYTES", "8192"))
+OUTPUT_TAIL_BYTES = int(os.getenv("SHELL_OUTPUT_TAIL_BYTES", "8192"))
+# Concurrent commands per batch, and the timeout for commands the model gives none for
+SHELL_WORKERS = int(os.getenv("SHELL_WORKERS", "4"))
+SHELL_COMMAND_TIMEOUT = float(os.getenv("SHELL_COMMAND_TIMEOUT", "120"))
+
+# Budget for the rare full resend (when the previous response cannot be chained): the last
+# turns go verbatim, older command outputs are cut short and the oldest turns dropped
+RESEND_BUDGET_BYTES = int(os.getenv("SHELL_RESEND_BUDGET_BYTES", "60000"))
+RESEND_KEEP_TURNS = int(os.getenv("SHELL_RESEND_KEEP_TURNS", "2"))
+OLD_OUTPUT_CHARS = int(os.getenv("SHELL_OLD_OUTPUT_CHARS", "400"))
+# Reasoning items come back with their encrypted content, so a resend doesn't depend on stored state
+REASONING_INCLUDE = ["reasoning.encrypted_content"]
 
 # --- LOGGING UTILITY ---
 
-def save_as_markdown(history):
+def save_as_markdown(history, filepath=None):
     """Saves the conversation as a readable Markdown file with code blocks."""
-    log_dir = os.path.join(BASE, "logs")
+    log_dir = config.LOG_DIR
     os.makedirs(log_dir, exist_ok=True)
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filepath = os.path.join(log_dir, f"session_{timestamp}.md")
+    filepath = filepath or os.path.join(log_dir, f"session_{timestamp}_{os.getpid()}.md")
 
     with open(filepath, 'w', encoding='utf-8') as f:
         f.write(f"# Session Log - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
@@ -43,52 +58,278 @@ def save_as_markdown(history):
 
     print(f"\n{Colors.BLUE}History saved to: {filepath}{Colors.ENDC}")
 
-def save_as_json(history):
+def save_as_json(history, filepath=None):
     """Saves the conversation history as a JSON file."""
-    import json
-    log_dir = os.path.join(BASE, "logs")
+    log_dir = config.LOG_DIR
     os.makedirs(log_dir, exist_ok=True)
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filepath = os.path.join(log_dir, f"session_{timestamp}.json")
+    filepath = filepath or os.path.join(log_dir, f"session_{timestamp}_{os.getpid()}.json")
 
     with open(filepath, 'w', encoding='utf-8') as f:
         json.dump(history, f, indent=4)
 
     print(f"\n{Colors.BLUE}History saved to: {filepath}{Colors.ENDC}")
+
+def export_session(journal_path):
+    """Writes the Markdown and JSON exports of a session journal next to it."""
+    history = read_history(journal_path)
+    stem = journal_path[:-len(".jsonl")]
+    save_as_markdown(history, f"{stem}.md")
+    save_as_json(history, f"{stem}.json")
 # --- FUNCTIONAL CORE ---
 
-def execute_shell_command(call):
-    """Handles the subprocess execution with a user confirmation step."""
-    args = getattr(call, "action", None) or getattr(call, "arguments", None)
+class BoundedCapture:
+    """Keeps the first `head` and the last `tail` bytes of a stream and counts the rest."""
 
-    def _get(obj, key, default=None):
-        return obj.get(key, default) if isinstance(obj, dict) else getattr(obj, key, default)
+    def __init__(self, head=OUTPUT_HEAD_BYTES, tail=OUTPUT_TAIL_BYTES):
+        self.head_limit = head
+        self.tail_limit = tail
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
 
-    command = _get(args, "command")
-    if not command: return "No command provided."
+    def write(self, data):
+        self.total += len(data)
+        room = self.head_limit - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if data and self.tail_limit > 0:
+            self.tail += data
+            if len(self.tail) > self.tail_limit:
+                del self.tail[:len(self.tail) - self.tail_limit]
 
-    # --- CONFIRMATION STEP ---
-    print(f"\n{Colors.BOLD}{Colors.YELLOW}MODEL REQUESTS COMMAND:{Colors.ENDC} {command}")
-    confirm = input(f"Execute this command? ([y]/n): ").lower()
+    @property
+    def omitted(self):
+        return self.total - len(self.head) - len(self.tail)
 
-    if confirm not in ['', 'y']:
-        print(f"{Colors.RED}Command aborted by user.{Colors.ENDC}")
-        return "User refused to execute this command."
+    def text(self):
+        head = self.head.decode(errors="replace")
+        if not self.omitted:
+            return head + self.tail.decode(errors="replace")
+        return (f"{head}\n…[{self.omitted} bytes omitted]…\n"
+                f"{self.tail.decode(errors='replace')}")
 
-    if isinstance(command, str): command = shlex.split(command)
+def kill_process(proc):
+    """Kills the command and, on POSIX, everything it started (its own process group)."""
+    try:
+        if os.name == "posix":
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+def run_command(command, cwd=None, env=None, timeout=None, on_output=None, on_start=None):
+    """Runs a command, passing its combined stdout/stderr to `on_output` as it arrives.
 
+    Only a bounded head and tail of the output is kept in memory. The process is
+    killed on timeout or Ctrl-C; `on_start` receives the process so callers can kill
+    it too. Returns a dict with exit_code, seconds, capture and
+    the timed_out / interrupted flags.
+    """
+    with span("subprocess", program=os.path.basename(command[0])) as process_span:
+        result = _run_command(command, cwd, env, timeout, on_output, on_start)
+        process_span.set(exit_code=result["exit_code"], output_bytes=result["capture"].total)
+    return result
+
+def _run_command(command, cwd, env, timeout, on_output, on_start):
+    capture = BoundedCapture()
+    start_time = time.perf_counter()
+    proc = subprocess.Popen(command, cwd=cwd, env=env, stdin=subprocess.DEVNULL,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            start_new_session=os.name == "posix")
+    if on_start:
+        on_start(proc)
+    timed_out = threading.Event()
+
+    def kill_on_timeout():
+        timed_out.set()
+        kill_process(proc)
+
+    timer = threading.Timer(timeout, kill_on_timeout) if timeout else None
+    if timer:
+        timer.daemon = True
+        timer.start()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    interrupted = False
     try:
-        completed = subprocess.run(
-            command,
-            cwd=_get(args, "working_directory") or os.getcwd(),
-            env={**os.environ, **(_get(args, "env") or {})},
-            capture_output=True, text=True,
-            timeout=(_get(args, "timeout_ms") / 1000) if _get(args, "timeout_ms") else None,
-        )
-        return completed.stdout + completed.stderr
-    except Exception as e:
-        return f"Error executing command: {str(e)}"
+        while chunk := proc.stdout.read1(65536):
+            capture.write(chunk)
+            if on_output:
+                on_output(decoder.decode(chunk))
+        proc.wait()
+    except KeyboardInterrupt:
+        interrupted = True
+        kill_process(proc)
+        proc.wait()
+    finally:
+        if timer:
+            timer.cancel()
+        proc.stdout.close()
+    return {
+        "exit_code": proc.returncode,
+        "seconds": time.perf_counter() - start_time,
+        "capture": capture,
+        "timed_out": timed_out.is_set(),
+        "interrupted": interrupted,
+    }
+
+def result_status(result):
+    """One-line summary: how the command ended, how long it took and how much it printed."""
+    capture = result["capture"]
+    if result["timed_out"]:
+        status = "killed after timeout"
+    elif result["interrupted"]:
+        status = "interrupted by user"
+    else:
+        status = f"exit code {result['exit_code']}"
+    size = f"{capture.total} bytes of output"
+    if capture.omitted:
+        size += f", truncated to the first {len(capture.head)} and last {len(capture.tail)} bytes"
+    return f"[{status} | {result['seconds']:.2f}s | {size}]"
+
+def format_result(result):
+    """The command result as sent to the model: bounded output plus exit code and timing."""
+    return f"{result['capture'].text()}\n{result_status(result)}"
+
+def _get(obj, key, default=None):
+    return obj.get(key, default) if isinstance(obj, dict) else getattr(obj, key, default)
+
+def parse_call(call):
+    """Normalizes a local_shell call into call_id, command (argv list), cwd, env and timeout."""
+    args = getattr(call, "action", None) or getattr(call, "arguments", None)
+    command = _get(args, "command")
+    if isinstance(command, str): command = shlex.split(command)
+    timeout_ms = _get(args, "timeout_ms")
+    return {
+        "call_id": _get(call, "call_id") or _get(call, "id"),
+        "command": command,
+        "cwd": _get(args, "working_directory") or os.getcwd(),
+        "env": {**os.environ, **(_get(args, "env") or {})},
+        "timeout": timeout_ms / 1000 if timeout_ms else SHELL_COMMAND_TIMEOUT,
+    }
+
+def confirm_calls(calls, runnable):
+    """Asks once for the whole batch; returns the approved subset of the `runnable` indexes."""
+    print(f"\n{Colors.BOLD}{Colors.YELLOW}MODEL REQUESTS {len(runnable)} COMMAND{'S' if len(runnable) > 1 else ''}:{Colors.ENDC}")
+    for i in runnable:
+        mode = "read-only" if is_read_only(calls[i]["command"]) else "runs alone"
+        print(f"  [{i + 1}] {shlex.join(calls[i]['command'])}  {Colors.BLUE}({mode}){Colors.ENDC}")
+    with span("user.confirm", commands=len(runnable)):
+        if len(runnable) == 1:
+            answer = input("Execute this command? ([y]/n): ").lower().strip()
+        else:
+            answer = input("Execute these commands? ([y]/n, or the numbers to run, e.g. 1,3): ").lower().strip()
+    if answer in ("", "y"):
+        return set(runnable)
+    picked = {int(n) - 1 for n in answer.replace(",", " ").split() if n.isdigit()}
+    return picked.intersection(runnable)
+
+class LinePrinter:
+    """Prints a command's output line by line with a prefix, so concurrent commands stay readable."""
+    lock = threading.Lock()
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.partial = ""
+
+    def __call__(self, text):
+        lines = (self.partial + text).split("\n")
+        self.partial = lines.pop()
+        if lines:
+            with self.lock:
+                print("\n".join(f"{self.prefix}{line}" for line in lines), flush=True)
+
+    def flush(self):
+        if self.partial:
+            self(self.partial + "\n")
+
+def plan_batches(calls, approved):
+    """Groups approved calls in order: consecutive read-only ones share a batch, others run alone."""
+    batches = []
+    for i, call in enumerate(calls):
+        if i not in approved:
+            continue
+        if is_read_only(call["command"]) and batches and batches[-1][1]:
+            batches[-1][0].append(i)
+        else:
+            batches.append(([i], is_read_only(call["command"])))
+    return [indexes for indexes, _ in batches]
+
+def execute_shell_calls(shell_calls, on_result=None):
+    """Confirms and runs every shell call of a response.
+
+    The user approves the whole batch once. Approved commands run in the model's
+    order, with consecutive read-only ones concurrently on a worker pool, each under
+    its own timeout. `on_result(call, result)` is called as each command finishes.
+    Returns [(shell call, parsed call, output text)] in call order.
+    """
+    calls = [parse_call(call) for call in shell_calls]
+    runnable = [i for i, call in enumerate(calls) if call["command"]]
+    approved = confirm_calls(calls, runnable) if runnable else set()
+    outputs = [None if i in approved else "User refused to execute this command." for i in range(len(calls))]
+    for i, call in enumerate(calls):
+        if not call["command"]:
+            outputs[i] = "No command provided."
+    if len(approved) < len(runnable):
+        print(f"{Colors.RED}{len(runnable) - len(approved)} command(s) aborted by user.{Colors.ENDC}")
+
+    running = set()
+    interrupted = threading.Event()
+    prefixed = len(approved) > 1
+    not_run = "Not run: the user interrupted the batch."
+
+    def started(proc):
+        running.add(proc)
+        # Started just as the user interrupted, after the running ones were killed
+        if interrupted.is_set():
+            kill_process(proc)
+
+    def run(i):
+        # Queued behind SHELL_WORKERS when Ctrl-C came: don't start it
+        if interrupted.is_set():
+            return not_run
+        call = calls[i]
+        printer = LinePrinter(f"{Colors.CYAN}[{i + 1}]{Colors.ENDC} " if prefixed else "")
+        try:
+            result = run_command(call["command"], cwd=call["cwd"], env=call["env"], timeout=call["timeout"],
+                                 on_output=printer, on_start=started)
+        except Exception as e:
+            return f"Error executing command: {str(e)}"
+        finally:
+            printer.flush()
+        result["interrupted"] = result["interrupted"] or interrupted.is_set()
+        label = f"[{i + 1}] " if prefixed else ""
+        print(f"{Colors.CYAN}{label}{result_status(result)}{Colors.ENDC}")
+        if on_result:
+            on_result(call, result)
+        return format_result(result)
+
+    if approved:
+        print(f"\n{Colors.CYAN}Command Output:{Colors.ENDC}")
+    with ThreadPoolExecutor(max_workers=max(1, SHELL_WORKERS)) as pool:
+        for batch in plan_batches(calls, approved):
+            if interrupted.is_set():
+                for i in batch:
+                    outputs[i] = not_run
+                continue
+            futures = {i: pool.submit(run, i) for i in batch}
+            try:
+                for i, future in futures.items():
+                    outputs[i] = future.result()
+            except KeyboardInterrupt:
+                # Ctrl-C reaches only this thread: drop the queued commands, stop the running ones
+                interrupted.set()
+                for future in futures.values():
+                    future.cancel()
+                for proc in list(running):
+                    kill_process(proc)
+                for i, future in futures.items():
+                    outputs[i] = not_run if future.cancelled() else future.result()
+    print()
+    return list(zip(shell_calls, calls, outputs))
 
 def filter_assistant_output(response_output):
     """Converts model output to API-safe formats for conversation history."""
@@ -102,55 +343,179 @@ def filter_assistant_output(response_output):
             history_items.append({"type": "output_text", "text": f"[System Action: Executed {cmd}]"})
     return history_items
 
+def output_items(response_output):
+    """Model output items to re-send on a full resend (reasoning, messages and shell calls, as dicts).
+
+    The API rejects a stored message or shell call sent back without the reasoning item
+    it came with; requests ask for `reasoning.encrypted_content` so that item is
+    self-contained even when the previous response is no longer stored.
+    """
+    return [item.model_dump(exclude_none=True) for item in response_output
+            if item.type in ("reasoning", "message", "local_shell_call")]
+
+def payload_bytes(items):
+    return len(json.dumps(items, default=str))
+
+def compact_transcript(items, budget=RESEND_BUDGET_BYTES, keep_turns=RESEND_KEEP_TURNS, old_chars=OLD_OUTPUT_CHARS):
+    """Fits the full transcript into `budget` bytes for a resend.
+
+    The first item (the instructions) is always kept. The last `keep_turns` user turns
+    are verbatim; older command outputs are truncated, then the oldest turns dropped.
+    """
+    head, rest = items[:1], items[1:]
+    turns = []
+    for item in rest:
+        if item.get("role") == "user" or not turns:
+            turns.append([])
+        turns[-1].append(item)
+    split = max(len(turns) - keep_turns, 0)
+
+    def shorten(item):
+        output = item.get("output", "")
+        if item.get("type") != "local_shell_call_output" or len(output) <= old_chars:
+            return item
+        return {**item, "output": f"{output[:old_chars]}\n…[{len(output) - old_chars} chars of old output truncated]"}
+
+    older = [[shorten(item) for item in turn] for turn in turns[:split]]
+    recent = turns[split:]
+    while older and payload_bytes(head + [i for turn in older + recent for i in turn]) > budget:
+        older.pop(0)
+    return head + [item for turn in older + recent for item in turn]
+
 # --- MAIN LOOP ---
 
-def main():
-    # Initial instruction set
-    conversation_history = [{
-        "role": "user",
-        "content": [{"type": "input_text", "text": "Helpful IT assistant. Always explain your shell actions."}]
-    }]
+def main(chain=True):
+    # The SDK loads while the first prompt is typed
+    warm_up(openai_client)
+    journal = SessionJournal(config.LOG_DIR)
+    print(f"{Colors.BLUE}Session journal: {journal.path}{Colors.ENDC}")
+    conversation_history = []
+    # What the API has seen, in its own item format, for when a full resend is needed
+    transcript = []
+    previous_response_id = None
+
+    def add_message(message):
+        conversation_history.append(message)
+        journal.message(message)
 
-    while True:
-        print(f"{Colors.GREEN}System ready. Type 'quit' to exit.{Colors.ENDC}")
-        user_input = input(f"{Colors.BOLD}You: {Colors.ENDC}")
+    def record_command(call, result):
+        journal.append("command", call_id=call["call_id"], command=call["command"], cwd=call["cwd"],
+                       exit_code=result["exit_code"], seconds=round(result["seconds"], 3),
+                       timed_out=result["timed_out"], interrupted=result["interrupted"],
+                       output_bytes=result["capture"].total, output=result["capture"].text())
 
-        if user_input.lower() in ['quit', 'exit', 'q']:
-            save_as_markdown(conversation_history)
-            save_as_json(conversation_history)
-            sys.exit(0)
+    def request(new_items):
+        """Sends only the new items on top of the previous response; resends everything if that fails."""
+        nonlocal previous_response_id
+        transcript.extend(new_items)
+        start_time = time.perf_counter()
+        response = None
+        if chain and previous_response_id:
+            mode, payload = "chained", new_items
+            try:
+                with span("model.response", mode=mode, payload_bytes=payload_bytes(payload)):
+                    response = openai_client().responses.create(
+                        model="codex-mini-latest",
+                        tools=[{"type": "local_shell"}],
+                        input=payload,
+                        include=REASONING_INCLUDE,
+                        previous_response_id=previous_response_id,
+                    )
+            except (openai.BadRequestError, openai.NotFoundError) as e:
+                # Expired or unstored previous response: fall back to sending the transcript
+                print(f"{Colors.YELLOW}Cannot continue from the previous response ({e.status_code}), resending the conversation.{Colors.ENDC}")
+        if response is None:
+            mode = "full resend" if previous_response_id else "new conversation"
+            payload = compact_transcript(transcript)
+            with span("model.response", mode=mode, payload_bytes=payload_bytes(payload)):
+                response = openai_client().responses.create(
+                    model="codex-mini-latest",
+                    tools=[{"type": "local_shell"}],
+                    input=payload,
+                    include=REASONING_INCLUDE,
+                )
+        seconds = time.perf_counter() - start_time
+        size = payload_bytes(payload)
+        print(f"{Colors.BLUE}↳ {mode}: {size / 1024:.1f} KB sent ({len(payload)} items), "
+              f"{seconds * 1000:.0f}ms{Colors.ENDC}")
+        journal.append("request", mode=mode, payload_bytes=size, items=len(payload),
+                       transcript_bytes=payload_bytes(transcript), seconds=round(seconds, 3), response_id=response.id)
+        previous_response_id = response.id
+        transcript.extend(output_items(response.output))
+        return response
 
-        conversation_history.append({
-            "role": "user",
-            "content": [{"type": "input_text", "text": user_input}],
-        })
+    # Initial instruction set
+    instructions = {
+        "role": "user",
+        "content": [{"type": "input_text", "text": "Helpful IT assistant. Always explain your shell actions."}]
+    }
+    add_message(instructions)
+    pending = [instructions]
 
+    try:
         while True:
-            response = client.responses.create(
-                model="codex-mini-latest",
-                tools=[{"type": "local_shell"}],
-                input=conversation_history,
-            )
-
-            # Store assistant thought/text
-            assistant_items = filter_assistant_output(response.output)
-            if assistant_items:
-                conversation_history.append({"role": "assistant", "content": assistant_items})
-
-            # Check for shell execution
-            shell_calls = [i for i in response.output if i.type in ["local_shell_call", "tool_call"]]
-            if not shell_calls:
-                # Print final model text and break inner loop
-                print(f"\n{Colors.GREEN}Model:{Colors.ENDC} {response.output_text or '(Done)'}\n")
+            print(f"{Colors.GREEN}System ready. Type 'export' to save the session as Markdown/JSON, 'quit' to exit.{Colors.ENDC}")
+            # Waiting for the user is a good moment to hand buffered records to the OS
+            journal.flush()
+            user_input = input(f"{Colors.BOLD}You: {Colors.ENDC}")
+
+            if user_input.lower() in ['quit', 'exit', 'q']:
                 break
+            if user_input.lower() == 'export':
+                journal.flush()
+                export_session(journal.path)
+                continue
 
-            # Handle execution and return output to history
-            result = execute_shell_command(shell_calls[0])
-            print(f"\n{Colors.CYAN}Command Output:{Colors.ENDC}\n{result}\n")
-            conversation_history.append({
+            message = {
                 "role": "user",
-                "content": [{"type": "input_text", "text": f"Command Output:\n{result}"}],
-            })
+                "content": [{"type": "input_text", "text": user_input}],
+            }
+            add_message(message)
+            pending.append(message)
+
+            while True:
+                response = request(pending)
+                pending = []
+
+                # Store assistant thought/text
+                assistant_items = filter_assistant_output(response.output)
+                if assistant_items:
+                    add_message({"role": "assistant", "content": assistant_items})
+
+                # Check for shell execution
+                shell_calls = [i for i in response.output if i.type in ["local_shell_call", "tool_call"]]
+                if not shell_calls:
+                    # Print final model text and break inner loop
+                    print(f"\n{Colors.GREEN}Model:{Colors.ENDC} {response.output_text or '(Done)'}\n")
+                    break
+
+                # Run every proposed command (output is streamed while they run) and
+                # send all results back together, each as the output of its call id
+                results = execute_shell_calls(shell_calls, on_result=record_command)
+                pending = [{"type": "local_shell_call_output", "call_id": call["call_id"], "output": output}
+                           for _, call, output in results]
+                report = "\n\n".join(f"[{call['call_id']}] $ {shlex.join(call['command'] or [])}\n{output}"
+                                       for _, call, output in results)
+                add_message({
+                    "role": "user",
+                    "content": [{"type": "input_text", "text": f"Command Output:\n{report}"}],
+                })
+    except (KeyboardInterrupt, EOFError):
+        print()
+    finally:
+        journal.close()
+        print(f"\n{Colors.BLUE}Session journal saved to: {journal.path}{Colors.ENDC}")
+        print(f"{Colors.BLUE}Export it with: python {os.path.relpath(__file__)} --export {journal.path}{Colors.ENDC}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    ap = argparse.ArgumentParser(description="Interactive local_shell client")
+    ap.add_argument("--export", metavar="JOURNAL", help="Write the Markdown and JSON exports of a session journal and exit")
+    ap.add_argument("--no-chain", action="store_true",
+                    help="Resend the (compacted) conversation every time instead of chaining with previous_response_id")
+    instrumentation.add_arguments(ap)
+    args = ap.parse_args()
+    if args.export:
+        export_session(args.export)
+    else:
+        with instrumentation.session(args, "local-shell"):
+            main(chain=not args.no_chain)
@@ -0,0 +1,104 @@
+"""
+Append-only JSONL journal of a local_shell session.
+
+Every conversation message and command result is appended as one JSON record when it
+happens. Writes are buffered and fsynced at most every few seconds, and the file is
+rotated into gzip-compressed segments once it grows past a size limit, so a crash loses
+at most the last few seconds and long sessions never rewrite what is already on disk.
+"""
+
+import glob
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+
+JOURNAL_MAX_BYTES = int(os.getenv("SHELL_JOURNAL_MAX_BYTES", str(10 * 1024 * 1024)))
+JOURNAL_FSYNC_SECONDS = float(os.getenv("SHELL_JOURNAL_FSYNC_SECONDS", "5"))
+JOURNAL_BUFFER_BYTES = 64 * 1024
+
+class SessionJournal:
+    def __init__(self, log_dir, name=None, max_bytes=JOURNAL_MAX_BYTES, fsync_seconds=JOURNAL_FSYNC_SECONDS):
+        os.makedirs(log_dir, exist_ok=True)
+        # The pid keeps sessions started in the same second (batch or benchmark runs) apart
+        name = name or f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+        self.path = os.path.join(log_dir, f"{name}.jsonl")
+        self.max_bytes = max_bytes
+        self.fsync_seconds = fsync_seconds
+        self.seq = 0
+        self.last_sync = time.monotonic()
+        self._lock = threading.Lock()
+        self._file = open(self.path, "a", encoding="utf-8", buffering=JOURNAL_BUFFER_BYTES)
+        self.size = os.path.getsize(self.path)
+
+    def append(self, kind, **fields):
+        """Appends one record; thread-safe."""
+        with self._lock:
+            self.seq += 1
+            record = {"seq": self.seq, "ts": time.time(), "type": kind, **fields}
+            line = json.dumps(record, ensure_ascii=False) + "\n"
+            self._file.write(line)
+            self.size += len(line.encode("utf-8"))
+            if time.monotonic() - self.last_sync >= self.fsync_seconds:
+                self._sync()
+            if self.size >= self.max_bytes:
+                self._rotate()
+
+    def message(self, message):
+        """Journals a conversation message ({'role', 'content'})."""
+        self.append("message", role=message["role"], content=message["content"])
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.last_sync = time.monotonic()
+
+    def _rotate(self):
+        self._sync()
+        self._file.close()
+        segment = f"{self.path[:-len('.jsonl')]}.{len(segments(self.path)) + 1:03d}.jsonl.gz"
+        with open(self.path, "rb") as src, gzip.open(segment, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        self._file = open(self.path, "w", encoding="utf-8", buffering=JOURNAL_BUFFER_BYTES)
+        self.size = 0
+
+    def flush(self):
+        """Hands buffered records to the OS (survives the process dying, not the machine)."""
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+
+def segments(path):
+    """Rotated, compressed segments of a journal, oldest first."""
+    return sorted(glob.glob(f"{glob.escape(path[:-len('.jsonl')])}.[0-9][0-9][0-9].jsonl.gz"))
+
+def read_records(path):
+    """Yields every record of a journal across its rotated segments.
+
+    A truncated last line (the process died mid-write) is skipped.
+    """
+    for segment in segments(path):
+        with gzip.open(segment, "rt", encoding="utf-8") as f:
+            yield from _parse(f)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            yield from _parse(f)
+
+def _parse(lines):
+    for line in lines:
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            continue
+
+def read_history(path):
+    """Rebuilds the conversation history (list of messages) from a journal."""
+    return [{"role": r["role"], "content": r["content"]} for r in read_records(path) if r["type"] == "message"]
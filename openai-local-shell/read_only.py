@@ -0,0 +1,76 @@
+"""
+Classifies local_shell commands as read-only.
+
+A read-only command cannot change anything, so consecutive ones may run at the same
+time, and the confirmation prompt labels them as such. The check is conservative:
+a program is read-only only if it is on an allowlist and, for programs whose options
+can write or run other commands, every option is on that program's allowlist too.
+Anything unknown runs alone.
+"""
+
+import os
+import re
+import shlex
+
+# Programs that only read state whatever their arguments (no `env`: it runs any
+# command; no `date`/`hostname`: they set the clock / the host name when given an argument)
+READ_ONLY_PROGRAMS = {
+    "cat", "df", "du", "echo", "free", "grep", "head", "id", "ls", "lsblk", "nproc", "printenv", "ps",
+    "pwd", "stat", "tail", "uname", "uptime", "wc", "which", "whoami",
+}
+# Programs that are read-only only with these options (`rg --pre` runs a command,
+# `tree -o` and `file -C` write files)
+READ_ONLY_OPTIONS = {
+    "rg": {"-i", "-n", "-l", "-c", "-w", "-F", "-S", "-s", "-g", "--glob", "-t", "--type", "--hidden",
+           "--files", "--no-ignore", "-A", "-B", "-C", "--max-count", "-m"},
+    "tree": {"-a", "-d", "-f", "-L", "-I", "-P", "-s", "-h", "--du", "-D", "--noreport", "--dirsfirst"},
+    "file": {"-b", "-i", "-L", "--mime", "--mime-type", "--brief"},
+    # `-fls`, `-fprint*`, `-exec*`, `-ok*` and `-delete` write or run commands
+    "find": {"-name", "-iname", "-path", "-ipath", "-wholename", "-regex", "-iregex", "-type", "-xtype",
+             "-size", "-empty", "-mtime", "-mmin", "-atime", "-amin", "-ctime", "-cmin", "-newer", "-user",
+             "-group", "-perm", "-links", "-maxdepth", "-mindepth", "-mount", "-xdev", "-depth", "-prune",
+             "-print", "-print0", "-printf", "-ls", "-not", "-a", "-and", "-o", "-or", "-true", "-false",
+             "-readable", "-writable", "-executable", "-L", "-H", "-P"},
+}
+# git subcommands that only read, and the options allowed with them (`--output` writes a
+# file, `branch -D`/`-m`/`-c` and friends change refs)
+READ_ONLY_GIT = {"blame", "branch", "diff", "log", "ls-files", "rev-parse", "show", "status"}
+READ_ONLY_GIT_OPTIONS = {
+    "-a", "-b", "-n", "-p", "-r", "-s", "-u", "-v", "-w", "--abbrev-ref", "--all", "--author", "--cached",
+    "--color", "--decorate", "--format", "--graph", "--list", "--name-only", "--name-status", "--no-color",
+    "--oneline", "--patch", "--porcelain", "--pretty", "--remotes", "--short", "--show-toplevel", "--since",
+    "--staged", "--stat", "--until", "--untracked-files", "--verbose",
+}
+SHELLS = {"sh", "bash", "zsh"}
+# Numeric values such as `-mtime -7` or `git log -5` are not options
+NUMBER_RE = re.compile(r"-\d+$")
+
+def options_allowed(args, allowed):
+    """True if every option in `args` (compared without any `=value`) is in `allowed`."""
+    return all(not arg.startswith("-") or NUMBER_RE.match(arg) or arg.split("=", 1)[0] in allowed
+               for arg in args)
+
+def is_read_only(command):
+    """Conservative check that a command cannot change anything, so it can run concurrently."""
+    if not command:
+        return False
+    program = os.path.basename(command[0])
+    if program in SHELLS and len(command) == 3 and command[1] in ("-c", "-lc"):
+        script = command[2]
+        # Redirections, command lists, subshells, groups and (process) substitutions could do anything
+        if any(token in script for token in ("<", ">", ";", "&", "`", "$", "(", "{", "\n")):
+            return False
+        try:
+            return all(is_read_only(shlex.split(segment)) for segment in script.split("|"))
+        except ValueError:
+            return False
+    if program == "git":
+        if len(command) < 2 or command[1] not in READ_ONLY_GIT:
+            return False
+        # `git branch NAME` creates a branch; only listing is read-only
+        if command[1] == "branch" and any(not arg.startswith("-") for arg in command[2:]):
+            return False
+        return options_allowed(command[2:], READ_ONLY_GIT_OPTIONS)
+    if program in READ_ONLY_OPTIONS:
+        return options_allowed(command[1:], READ_ONLY_OPTIONS[program])
+    return program in READ_ONLY_PROGRAMS
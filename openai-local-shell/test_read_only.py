@@ -0,0 +1,42 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from read_only import is_read_only
+
+CASES = [
+    (["ls", "-la"], True),
+    (["cat", "README.md"], True),
+    (["bash", "-lc", "ps aux | grep python"], True),
+    (["git", "status", "--short"], True),
+    (["git", "log", "--oneline", "-5"], True),
+    (["git", "branch", "-a"], True),
+    (["find", ".", "-name", "*.py", "-mtime", "-7"], True),
+    (["env", "rm", "-rf", "/tmp/x"], False),
+    (["git", "branch", "-D", "main"], False),
+    (["git", "branch", "feature"], False),
+    (["git", "diff", "--output=x"], False),
+    (["git", "-C", "/tmp", "status"], False),
+    (["hostname", "evil"], False),
+    (["date", "-s", "2020-01-01"], False),
+    (["find", ".", "-fprint0", "out"], False),
+    (["find", ".", "-fls", "out"], False),
+    (["find", ".", "-delete"], False),
+    (["rg", "--pre", "sh", "x"], False),
+    (["tree", "-o", "out"], False),
+    (["bash", "-c", "ls > out"], False),
+    (["bash", "-c", "cat <(rm -rf /tmp/x)"], False),
+    (["bash", "-c", "cat >(rm -rf /tmp/x)"], False),
+    (["bash", "-c", "cat $(rm -rf /tmp/x)"], False),
+    (["bash", "-c", "(rm -rf /tmp/x)"], False),
+    (["bash", "-c", "{ rm -rf /tmp/x; }"], False),
+    (["bash", "-c", "cat < /etc/passwd"], False),
+    (["rm", "-rf", "/tmp/x"], False),
+    ([], False),
+]
+
+@pytest.mark.parametrize("command, expected", CASES)
+def test_is_read_only(command, expected):
+    assert is_read_only(command) is expected